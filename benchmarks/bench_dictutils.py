@@ -0,0 +1,133 @@
+"""
+Benchmarks for `grabutils.dictutils`
+
+Run with::
+
+    python -m benchmarks.bench_dictutils
+"""
+import re
+import timeit
+
+from grabutils.dictutils import dictview
+
+PAYLOAD = {
+    'data': {
+        'item': [
+            {'id': i, 'offer': {'price': i * 1.5, 'currency': 'USD'}}
+            for i in range(10)
+        ],
+        'meta': {'total': 10, 'page': 1},
+    }
+}
+
+PATHS = (
+    'data.item.0.offer.price',
+    'data.item.5.offer.currency',
+    'data.meta.total',
+    'data.missing.key',
+)
+
+
+def legacy_scan(view: dictview, path: str) -> dictview:
+    d = dictview(view.value, inline=True)
+    for el in path.split('.'):
+        if re.match(r'^\d+$', el):
+            d = d[int(el)]
+        else:
+            d = d[el]
+    d.inline = view.inline
+    return d
+
+
+def report(name: str, fn, number: int, lookups: int = 1, base: float = None, unit: str = 'lookup') -> float:
+    per_lookup = min(timeit.repeat(fn, number=number, repeat=5)) / number / lookups
+    speedup = f'x{base / per_lookup:.1f}' if base else ''
+    print(f'{name:<32} {per_lookup * 1e6:8.3f} us/{unit} {speedup}')
+    return per_lookup
+
+
+def bench_scan(number=50000):
+    view = dictview(PAYLOAD)
+
+    def legacy():
+        for path in PATHS:
+            legacy_scan(view, path).value
+
+    def scan():
+        for path in PATHS:
+            view.scan(path).value
+
+    compiled = [dictview.compile(path) for path in PATHS]
+    value = view.value
+
+    def precompiled():
+        for path in compiled:
+            path(value)
+
+    base = report('scan (legacy)', legacy, number, len(PATHS))
+    report('scan (compiled, cached)', scan, number, len(PATHS), base)
+    report('dictpath (precompiled)', precompiled, number, len(PATHS), base)
+
+
+def bench_project(number=20000):
+    view = dictview(PAYLOAD)
+    fields = dict(
+        ('f%d' % i, 'data.item.3.offer.' + key)
+        for i, key in enumerate(('price', 'currency') * 5)
+    )
+
+    def legacy():
+        dict((k, legacy_scan(view, path).value) for k, path in fields.items())
+
+    def project():
+        view.project(**fields)
+
+    base = report('project (legacy, per key scan)', legacy, number, len(fields))
+    report('project (shared prefix plan)', project, number, len(fields), base)
+
+
+def bench_traversal(number=50000):
+    depth = 8
+    payload = node = {}
+    for i in range(depth):
+        node['k'] = [{}] if i % 2 else {}
+        node = node['k'][0] if i % 2 else node['k']
+    node['leaf'] = 1
+    view = dictview(payload)
+
+    def attrs():
+        view.k.k[0].k.k[0].k.k[0].k.k[0].leaf.value
+
+    cursor = view.cursor()
+
+    def attrs_cursor():
+        cursor.reset(payload).k.k[0].k.k[0].k.k[0].k.k[0].leaf.value
+
+    path = dictview.compile('k.k.0.k.k.0.k.k.0.k.k.0.leaf')
+    assert path(payload) == 1
+
+    def compiled():
+        path(payload)
+
+    hops = 13
+    print(f'deep path access, {hops} hops')
+    base = report('dictview attributes', attrs, number, hops)
+    report('dictcursor attributes', attrs_cursor, number, hops, base)
+    report('dictpath', compiled, number, hops, base)
+
+
+def bench_regex(number=200):
+    container = dict(('%s_%04d' % (prefix, i), i) for prefix in ('price', 'title', 'offer') for i in range(1000))
+    plain = dictview(container)
+    indexed = dictview(container, indexed=True)
+    pattern = re.compile('^price_01')
+
+    base = report('regex search (full scan)', lambda: plain[pattern], number)
+    report('regex search (key index)', lambda: indexed[pattern], number, base=base)
+
+
+if __name__ == '__main__':
+    bench_scan()
+    bench_project()
+    bench_traversal()
+    bench_regex()
@@ -0,0 +1,67 @@
+"""
+Benchmarks for `grabutils.objview`
+
+Run with::
+
+    python -m benchmarks.bench_objview
+"""
+from grabutils.objview import ObjectView, Project, Zip
+
+from .bench_dictutils import report
+
+RECORD = {
+    'id': 42,
+    'offer': {'price': '19.99', 'currency': 'USD', 'seller': {'name': 'ACME', 'rating': '4.5'}},
+    'tags': {'keys': ['a', 'b', 'c'], 'values': [1, 2, 3]},
+}
+
+
+def view_fields() -> dict:
+    return dict(
+        id=Project('id'),
+        price=Project('offer', 'price', astype=float),
+        currency=Project('offer', 'currency'),
+        seller=Project('offer', 'seller', 'name'),
+        rating=Project('offer', 'seller', 'rating', astype=float),
+        tags=Zip(Project('tags', 'keys'), Project('tags', 'values'), astype=dict),
+        __module__=__name__,
+    )
+
+
+CompiledView = type('CompiledView', (ObjectView,), view_fields())
+PlainView = type('PlainView', (ObjectView,), dict(view_fields(), Meta=type('Meta', (), {'compiled': False})))
+
+
+def bench_as_dict(number=20000):
+    compiled = CompiledView(RECORD)
+    plain = PlainView(RECORD)
+    assert compiled.as_dict() == plain.as_dict()
+
+    base = report('as_dict (descriptors)', plain.as_dict, number, unit='record')
+    report('as_dict (generated extractor)', compiled.as_dict, number, base=base, unit='record')
+
+
+def bench_export_many(size=200000, workers=4):
+    records = [RECORD] * size
+
+    base = report('export_many (in-process)', lambda: list(CompiledView.export_many(records, workers=1)),
+                  1, size, unit='record')
+    report(f'export_many ({workers} workers)', lambda: list(CompiledView.export_many(records, workers=workers)),
+           1, size, base=base, unit='record')
+
+
+def bench_to_columns(size=50000):
+    records = [RECORD] * size
+
+    def transpose():
+        rows = list(CompiledView.export_many(records, workers=1))
+        return dict((key, [row[key] for row in rows]) for key in CompiledView.export_fields())
+
+    base = report('export_many + transpose', transpose, 1, size, unit='record')
+    report('to_columns', lambda: CompiledView.to_columns(records), 1, size, base=base, unit='record')
+
+
+if __name__ == '__main__':
+    bench_as_dict()
+    bench_export_many()
+    bench_to_columns()
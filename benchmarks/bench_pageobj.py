@@ -0,0 +1,225 @@
+"""
+Benchmarks for `grabutils.bs.pageobj`
+
+Run with::
+
+    python -m benchmarks.bench_pageobj
+"""
+import gc
+import resource
+import tracemalloc
+from contextlib import contextmanager
+
+from bs4 import BeautifulSoup
+
+from grabutils.bs.pageobj import BsField, BsPageObj, Nested, PageObject, inner_text, as_attr, tree_cache
+
+from .bench_dictutils import report
+
+
+def listing_page(seed: int, rows: int = 50) -> str:
+    items = ''.join(
+        f'<div class="product-card" data-id="{seed}-{i}">'
+        f'<a class="title" href="/p/{seed}/{i}">Product {i}</a>'
+        f'<span class="price">{i}.99</span>'
+        f'<ul class="tags"><li>t{i % 3}</li><li>t{i % 5}</li></ul>'
+        f'</div>'
+        for i in range(rows)
+    )
+    return f'<html><head><title>Page {seed}</title></head><body><div class="listing">{items}</div></body></html>'
+
+
+def listing_fields() -> dict:
+    return dict(
+        title=BsField('head > title', inner_text),
+        names=BsField('.listing .product-card a.title', inner_text, many=True),
+        hrefs=BsField('.listing .product-card a.title', as_attr('href'), many=True),
+        prices=BsField('.listing .product-card span.price', inner_text, many=True),
+        tags=BsField('.listing .product-card ul.tags > li:nth-child(2)', inner_text, many=True),
+    )
+
+
+Listing = type('Listing', (PageObject,), listing_fields())
+LxmlListing = type('LxmlListing', (PageObject,), dict(listing_fields(), Meta=type('Meta', (), {'backend': 'lxml'})))
+
+
+def bench_selectors(pages: int = 100, number: int = 1):
+    corpus = [BeautifulSoup(listing_page(seed), features='lxml') for seed in range(pages)]
+    fields = [field for field in vars(Listing).values() if isinstance(field, BsField)]
+
+    def raw_selectors():
+        for soup in corpus:
+            for field in fields:
+                if field.many:
+                    [fn(node) for node in soup.select(field.selector) for fn in field.then]
+                else:
+                    field.then[0](soup.select_one(field.selector))
+
+    def compiled():
+        for soup in corpus:
+            for field in fields:
+                field(soup)
+
+    base = report('select (selector strings)', raw_selectors, number, pages, unit='page')
+    report('select (precompiled)', compiled, number, pages, base=base, unit='page')
+
+
+@contextmanager
+def no_tree_cache():
+    max_bytes, tree_cache.max_bytes = tree_cache.max_bytes, 0
+    tree_cache.clear()
+    try:
+        yield
+    finally:
+        tree_cache.max_bytes = max_bytes
+
+
+def bench_backends(pages: int = 100, number: int = 1):
+    corpus = [listing_page(seed) for seed in range(pages)]
+    assert Listing(corpus[0]).as_dict() == LxmlListing(corpus[0]).as_dict()
+
+    with no_tree_cache():
+        base = report('parse + as_dict (bs4)', lambda: [Listing(page).as_dict() for page in corpus],
+                      number, pages, unit='page')
+        report('parse + as_dict (lxml)', lambda: [LxmlListing(page).as_dict() for page in corpus],
+               number, pages, base=base, unit='page')
+
+
+def padded_page(seed: int, blocks: int = 200) -> str:
+    padding = ''.join(
+        f'<section class="noise"><h2>Block {i}</h2><p>{"lorem ipsum " * 20}</p></section>'
+        for i in range(blocks)
+    )
+    return listing_page(seed, rows=10).replace('<body>', '<body>' + padding)
+
+
+def bench_parse_only(pages: int = 50, number: int = 1):
+    corpus = [padded_page(seed) for seed in range(pages)]
+    strained = type('StrainedListing', (PageObject,), dict(listing_fields(), Meta=type('Meta', (), {'parse_only': True})))
+    assert Listing._parse_only is None and strained._parse_only is not None
+    assert Listing(corpus[0]).as_dict() == strained(corpus[0]).as_dict()
+
+    with no_tree_cache():
+        base = report('parse + as_dict (full parse)', lambda: [Listing(page).as_dict() for page in corpus],
+                      number, pages, unit='page')
+        report('parse + as_dict (parse_only)', lambda: [strained(page).as_dict() for page in corpus],
+               number, pages, base=base, unit='page')
+
+
+BsListing = type('BsListing', (BsPageObj,), listing_fields())
+
+
+def legacy_as_dict(page: BsPageObj) -> dict:
+    class_fields = set(fld for fld, inst in page.__class__.__dict__.items() if isinstance(inst, BsField))
+    transient_attrs = page.transient_attrs()
+    return dict(
+        (field, getattr(page, field))
+        for field in dir(page)
+        if (field in class_fields or field not in transient_attrs) and
+        not field.startswith('_') and
+        not field[0].isupper() and
+        not callable(getattr(page, field))
+    )
+
+
+def bench_as_dict(pages: int = 50, number: int = 1):
+    corpus = [BeautifulSoup(listing_page(seed), features='lxml') for seed in range(pages)]
+    assert legacy_as_dict(BsListing(corpus[0])) == BsListing(corpus[0]).as_dict() == Listing(corpus[0]).as_dict()
+
+    base = report('BsPageObj.as_dict (dir scan)', lambda: [legacy_as_dict(BsListing(soup)) for soup in corpus],
+                  number, pages, unit='page')
+    report('BsPageObj.as_dict (field table)', lambda: [BsListing(soup).as_dict() for soup in corpus],
+           number, pages, base=base, unit='page')
+    report('PageObject.as_dict', lambda: [Listing(soup).as_dict() for soup in corpus],
+           number, pages, base=base, unit='page')
+
+
+def detail_page(seed: int, attrs: int = 20) -> str:
+    product = ''.join(f'<div class="attr-{i}"><span>{seed}-{i}</span></div>' for i in range(attrs))
+    return padded_page(seed).replace('</body>', f'<div class="product">{product}</div></body>')
+
+
+def bench_plan(pages: int = 20, number: int = 1, attrs: int = 20):
+    corpus = [BeautifulSoup(detail_page(seed, attrs), features='lxml') for seed in range(pages)]
+    fields = dict((f'attr_{i}', BsField(f'.product .attr-{i} span', inner_text)) for i in range(attrs))
+    planned = type('PlannedDetail', (PageObject,), dict(fields, Meta=type('Meta', (), {'parse_only': False})))
+    unplanned = type('UnplannedDetail', (PageObject,),
+                     dict(fields, Meta=type('Meta', (), {'parse_only': False, 'plan': False})))
+    assert planned(corpus[0]).as_dict() == unplanned(corpus[0]).as_dict()
+
+    base = report('as_dict (page-wide selects)', lambda: [unplanned(soup).as_dict() for soup in corpus],
+                  number, pages, unit='page')
+    report('as_dict (query plan)', lambda: [planned(soup).as_dict() for soup in corpus],
+           number, pages, base=base, unit='page')
+
+
+def bench_tree_cache(pages: int = 20, number: int = 1):
+    corpus = [listing_page(seed) for seed in range(pages)]
+    meta = type('Meta', (), {'parse_only': False})
+    extractors = [
+        type(f'Extractor{i}', (PageObject,), dict(list(listing_fields().items())[i:i + 2], Meta=meta))
+        for i in range(4)
+    ]
+
+    def extract_all():
+        tree_cache.clear()
+        return [extractor(page).as_dict() for page in corpus for extractor in extractors]
+
+    with no_tree_cache():
+        base = report('4 extractors (parse per extractor)', extract_all, number, pages, unit='page')
+    report('4 extractors (tree cache)', extract_all, number, pages, base=base, unit='page')
+
+
+def bench_detached(pages: int = 50):
+    fields = dict(cards=BsField('.listing .product-card', many=True), **listing_fields())
+    live = type('LiveListing', (PageObject,), dict(fields, Meta=type('Meta', (), {'cache_trees': False})))
+    detached = type('DetachedListing', (PageObject,), dict(fields, Meta=type('Meta', (), {'detached': True})))
+    corpus = [listing_page(seed) for seed in range(pages)]
+
+    for name, klass in (('live tags', live), ('detached', detached)):
+        tracemalloc.start()
+        results = [klass(page).as_dict() for page in corpus]
+        gc.collect()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{"held results (" + name + ")":<32} {held / pages / 1024:>10.1f} KiB/page')
+        del results
+
+
+def bench_stream(rows: int = 20000, number: int = 1):
+    page = listing_page(0, rows=rows)
+    row_fields = dict(
+        name=BsField('a.title', inner_text),
+        href=BsField('a.title', as_attr('href')),
+        price=BsField('span.price', inner_text),
+        tags=BsField('ul.tags > li', inner_text, many=True),
+    )
+    row = type('ProductRow', (PageObject,), dict(row_fields, Meta=type('Meta', (), {'row': '.listing .product-card'})))
+    whole = type('WholeListing', (PageObject,), dict(
+        rows=BsField('.listing .product-card', Nested(type('Product', (PageObject,), row_fields)), many=True),
+        Meta=type('Meta', (), {'backend': 'lxml', 'cache_trees': False}),
+    ))
+    # libxml2 trees are invisible to tracemalloc, compare growth of peak RSS, lowest first
+    for name, extract in (('iter_rows', lambda: list(row.iter_rows(page))),
+                          ('whole tree', lambda: whole(page).as_dict()['rows'])):
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        extract()
+        grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+        print(f'{"peak RSS growth (" + name + ")":<32} {grown / 1024:>10.1f} MiB')
+
+    assert list(row.iter_rows(page)) == whole(page).as_dict()['rows']
+
+    with no_tree_cache():
+        base = report('rows (whole tree)', lambda: whole(page).as_dict(), number, rows, unit='row')
+    report('rows (iter_rows)', lambda: list(row.iter_rows(page)), number, rows, base=base, unit='row')
+
+
+if __name__ == '__main__':
+    bench_selectors()
+    bench_backends()
+    bench_parse_only()
+    bench_as_dict()
+    bench_plan()
+    bench_tree_cache()
+    bench_detached()
+    bench_stream()
@@ -0,0 +1,195 @@
+"""
+Benchmark suite for `grabutils.bs.pageobj` over the synthetic corpus
+
+Measures parse time, per-field extraction time, `as_dict` cost and peak
+memory for every page size, layout and parser, results are written as JSON
+so runs of different versions can be compared.
+
+Run with::
+
+    python -m benchmarks.bench_pageobj_suite --sizes 10KB 100KB --output new.json
+    python -m benchmarks.bench_pageobj_suite --compare old.json new.json
+"""
+import argparse
+import importlib.util
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from importlib import metadata
+
+from bs4 import BeautifulSoup
+
+from grabutils.bs.pageobj import BsField, PageObject, as_attr, inner_text
+
+from .corpus import LAYOUTS, SIZES, synthetic_page
+
+# bs4 parser feature -> module it requires
+PARSERS = {
+    'lxml': 'lxml',
+    'html.parser': None,
+    'html5lib': 'html5lib',
+}
+
+# pages from this size on are measured once
+LARGE_PAGE = 1024 * 1024
+
+
+def available_parsers(parsers) -> list:
+    return [parser for parser in parsers if PARSERS[parser] is None or importlib.util.find_spec(PARSERS[parser])]
+
+
+def suite_fields() -> dict:
+    return dict(
+        title=BsField('head > title', inner_text),
+        names=BsField('.listing .product-card a.title', inner_text, many=True),
+        hrefs=BsField('.product-card a.title', as_attr('href'), many=True),
+        prices=BsField('.product-card span.price', inner_text, many=True),
+        tags=BsField('ul.tags > li', inner_text, many=True),
+        next_page=BsField('footer a.next', as_attr('href')),
+    )
+
+
+def page_class(parser: str) -> type:
+    meta = type('Meta', (), {'parser': parser, 'parse_only': False, 'cache_trees': False})
+    return type('SuitePage', (PageObject,), dict(suite_fields(), Meta=meta))
+
+
+def timed(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(page: str, parser: str, repeat: int) -> dict:
+    """
+    Timings in seconds (best of `repeat`) and peak traced memory in bytes of one page
+    """
+    klass = page_class(parser)
+    parse = timed(lambda: BeautifulSoup(page, features=parser), repeat)
+
+    soup = BeautifulSoup(page, features=parser)
+    fields = dict(
+        (name, timed(lambda name=name, soup=soup: getattr(klass(soup), name), repeat))
+        for name in sorted(klass._export_fields)
+    )
+    as_dict = timed(lambda soup=soup: klass(soup).as_dict(), repeat)
+    del soup
+
+    tracemalloc.start()
+    klass(page).as_dict()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return dict(parse_s=parse, fields_s=fields, as_dict_s=as_dict, peak_bytes=peak)
+
+
+def run_suite(sizes=tuple(SIZES), layouts=LAYOUTS, parsers=tuple(PARSERS), repeat: int = 3, seed: int = 0) -> dict:
+    """
+    Measure every size, layout and parser combination
+
+    Returns
+    -------
+    dict
+        environment description and list of results, ready for `json.dump`
+    """
+    try:
+        version = metadata.version('grabutils')
+    except metadata.PackageNotFoundError:
+        version = 'unknown'
+
+    results = []
+    skipped = sorted(set(parsers) - set(available_parsers(parsers)))
+    for parser in skipped:
+        print(f'{parser:<12} skipped, parser is not installed')
+
+    for size_name in sizes:
+        size = SIZES[size_name]
+        for layout in layouts:
+            page = synthetic_page(size, layout, seed)
+            for parser in available_parsers(parsers):
+                result = measure(page, parser, repeat if size < LARGE_PAGE else 1)
+                result.update(size=size_name, bytes=len(page), layout=layout, parser=parser)
+                results.append(result)
+                print(
+                    f'{size_name:>6} {layout:<7} {parser:<12}'
+                    f' parse {result["parse_s"] * 1e3:10.2f} ms'
+                    f'  as_dict {result["as_dict_s"] * 1e3:10.2f} ms'
+                    f'  peak {result["peak_bytes"] / 2 ** 20:8.1f} MiB'
+                )
+
+    return dict(
+        grabutils=version,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        seed=seed,
+        results=results,
+    )
+
+
+def _metrics(result: dict) -> dict:
+    metrics = dict((key, result[key]) for key in ('parse_s', 'as_dict_s', 'peak_bytes'))
+    metrics.update((f'field:{name}', value) for name, value in result['fields_s'].items())
+    return metrics
+
+
+def compare(old: dict, new: dict, threshold: float = 1.1) -> list:
+    """
+    Print new / old ratio of every metric present in both runs
+
+    Returns
+    -------
+    list
+        (size, layout, parser, metric, ratio) of metrics grown by more than `threshold`
+    """
+    previous = dict(((r['size'], r['layout'], r['parser']), r) for r in old['results'])
+    regressions = []
+    print(f'{old["grabutils"]} -> {new["grabutils"]}')
+    for result in new['results']:
+        key = result['size'], result['layout'], result['parser']
+        if key not in previous:
+            continue
+        base = _metrics(previous[key])
+        for metric, value in _metrics(result).items():
+            if not base.get(metric):
+                continue
+            ratio = value / base[metric]
+            flag = ' REGRESSION' if ratio > threshold else ''
+            print(f'{key[0]:>6} {key[1]:<7} {key[2]:<12} {metric:<16} x{ratio:6.2f}{flag}')
+            if flag:
+                regressions.append(key + (metric, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument('--sizes', nargs='+', choices=tuple(SIZES), default=tuple(SIZES))
+    args.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=LAYOUTS)
+    args.add_argument('--parsers', nargs='+', choices=tuple(PARSERS), default=tuple(PARSERS))
+    args.add_argument('--repeat', type=int, default=3)
+    args.add_argument('--seed', type=int, default=0)
+    args.add_argument('--output', help='write results as JSON')
+    args.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two JSON results')
+    args.add_argument('--threshold', type=float, default=1.1)
+    opts = args.parse_args(argv)
+
+    if opts.compare:
+        runs = []
+        for path in opts.compare:
+            with open(path) as fh:
+                runs.append(json.load(fh))
+        return 1 if compare(*runs, threshold=opts.threshold) else 0
+
+    results = run_suite(opts.sizes, opts.layouts, opts.parsers, repeat=opts.repeat, seed=opts.seed)
+    if opts.output:
+        with open(opts.output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Deterministic synthetic HTML corpus for page-object benchmarks
+
+Pages are built from product cards until the requested size is reached, the
+same (size, layout, seed) always produces the same markup.
+"""
+import random
+
+LAYOUTS = ('flat', 'nested')
+
+SIZES = {
+    '10KB': 10 * 1024,
+    '100KB': 100 * 1024,
+    '1MB': 1024 * 1024,
+    '10MB': 10 * 1024 * 1024,
+}
+
+WORDS = (
+    'lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do',
+    'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'et', 'dolore', 'magna', 'aliqua',
+)
+
+
+def _card(rnd: random.Random, idx: int) -> str:
+    words = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 8)))
+    tags = ''.join(f'<li>{rnd.choice(WORDS)}</li>' for _ in range(rnd.randint(1, 4)))
+    return (
+        f'<div class="product-card" data-id="{idx}">'
+        f'<a class="title" href="/p/{idx}">{words.title()}</a>'
+        f'<span class="price">{rnd.randint(1, 999)}.{rnd.randint(0, 99):02d}</span>'
+        f'<p class="description">{words} {words}</p>'
+        f'<ul class="tags">{tags}</ul>'
+        f'</div>'
+    )
+
+
+def synthetic_page(size: int, layout: str = 'flat', seed: int = 0, depth: int = 32) -> str:
+    """
+    Listing page of about `size` characters
+
+    Parameters
+    ----------
+    size: int
+        target markup length, the page is at most one card (nested group) longer
+    layout: str
+        'flat' places every card directly into the listing, 'nested' wraps
+        groups of cards into `depth` levels of nested sections
+    seed: int
+        random seed of card contents
+    depth: int
+        nesting depth of 'nested' layout
+
+    Returns
+    -------
+    str
+        html document
+    """
+    if layout not in LAYOUTS:
+        raise Exception(f'Unknown layout *{layout}*, expected one of {LAYOUTS}')
+
+    rnd = random.Random(f'{seed}-{layout}-{size}')
+    head = f'<html><head><title>Synthetic {layout} {size}</title></head><body><div class="listing">'
+    tail = '</div><footer><a class="next" href="/page/2">Next</a></footer></body></html>'
+
+    parts = []
+    length = len(head) + len(tail)
+    idx = 0
+    while length < size:
+        if layout == 'flat':
+            part = _card(rnd, idx)
+            idx += 1
+        else:
+            cards = ''.join(_card(rnd, idx + i) for i in range(4))
+            idx += 4
+            part = cards
+            for level in range(depth):
+                part = f'<section class="level-{level}">{part}</section>'
+        parts.append(part)
+        length += len(part)
+
+    return head + ''.join(parts) + tail
+
+
+def corpus(sizes=SIZES, layouts=LAYOUTS, seed: int = 0):
+    """
+    Yield (size name, layout, page) for every size and layout
+    """
+    for name, size in sizes.items():
+        for layout in layouts:
+            yield name, layout, synthetic_page(size, layout, seed)
@@ -1,21 +1,160 @@
 import functools as fn
-import operator as op
 
-from bs4 import BeautifulSoup, Tag
+import hashlib
+import inspect
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import PurePath, Path
+
+import lxml.html
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from lxml import etree
+
+try:
+    from cssselect import HTMLTranslator
+except ImportError:
+    HTMLTranslator = None
+
+BACKENDS = ('bs4', 'lxml')
+
+ROW_CHUNK_SIZE = 64 * 1024
+
+TREE_CACHE_BYTES = 256 * 2 ** 20
+# trees kept at once, enough for several extractors of the page being processed
+TREE_CACHE_ENTRIES = 4
+# parsed tree size (process RSS) per char of markup, measured on benchmarks.corpus pages
+TREE_SIZE_FACTOR = {'bs4': 30, 'lxml': 12}
+
+logger = logging.getLogger(__name__)
+
+
+def css_to_xpath(selector: str, prefix: str = 'descendant::') -> str:
+    """
+    Translate CSS selector into XPath over descendants of context node, same scope as `Tag.select`
+    """
+    if HTMLTranslator is None:
+        raise ImportError('cssselect is required for lxml backend, install grabutils[bs]')
+    return HTMLTranslator().css_to_xpath(selector, prefix=prefix)
+
+
+DetachedNode = namedtuple('DetachedNode', 'name text attrs')
+
+
+def detach_value(value):
+    """
+    Copy extracted value out of the parsed tree
+
+    Nodes become `DetachedNode` (tag name, text, attrs), tree-bound strings
+    (bs4 `NavigableString`, lxml smart strings) become plain str, containers
+    are copied recursively, so the result keeps no reference to the tree.
+    """
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, DetachedNode) or value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, Tag):
+        return DetachedNode(
+            value.name,
+            value.get_text(),
+            dict((key, tuple(attr) if isinstance(attr, list) else str(attr)) for key, attr in value.attrs.items())
+        )
+    if isinstance(value, etree._Element):
+        return DetachedNode(
+            value.tag if isinstance(value.tag, str) else None,
+            str(value.text_content()) if isinstance(value.tag, str) else str(value.text or ''),
+            dict((key, tuple(lxml_attr(value, key))) if key in MULTI_VALUED_ATTRS else (key, str(attr))
+                 for key, attr in value.attrib.items())
+        )
+    if isinstance(value, dict):
+        return dict((key, detach_value(item)) for key, item in value.items())
+    if isinstance(value, list):
+        # also bs4 ResultSet, which keeps its source
+        return [detach_value(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(detach_value(item) for item in value)
+    return value
+
+
+def release_tree(tree):
+    """
+    Destroy parsed tree, detached values extracted from it stay valid
+    """
+    if isinstance(tree, etree._Element):
+        tree.clear()
+    elif isinstance(tree, Tag):
+        tree.decompose()
 
 
 class BsField:
-    def __init__(self, selector, *then, src_attr='page', many=False):
+    def __init__(self, selector, *then, src_attr='page', many=False, detached=None):
         self.src_attr = src_attr
         self.selector = selector
         self.many = many
         self.then = then
+        self.detached = detached
+        self.matcher = None
+        self.xpath = None
+        self.xpath_one = None
+        self.xpath_doc = None
+        self.xpath_doc_one = None
+
+    def compile(self, backend: str = 'bs4') -> 'BsField':
+        """
+        Precompile CSS selector, compiled matcher is immutable and shared between pages and threads
+        """
+        if not self.selector:
+            return self
+        if backend == 'lxml':
+            if self.xpath is None:
+                xpath = css_to_xpath(self.selector)
+                self.xpath = etree.XPath(xpath)
+                self.xpath_one = etree.XPath(f'({xpath})[1]')
+                # lxml pages are the <html> element, bs4 pages the document above it
+                xpath = css_to_xpath(self.selector, prefix='descendant-or-self::')
+                self.xpath_doc = etree.XPath(xpath)
+                self.xpath_doc_one = etree.XPath(f'({xpath})[1]')
+        elif self.matcher is None:
+            self.matcher = soupsieve.compile(self.selector)
+        return self
+
+    def __call_lxml(self, node):
+        then = self.then
+        if self.selector and self.xpath is None:
+            self.compile('lxml')
+
+        root = node.getparent() is None
+        if self.many:
+            res = (self.xpath_doc if root else self.xpath)(node) if self.selector else list(node)
+            return [
+                fn.reduce(lambda v, func: func(v), then, r)
+                for r in res
+            ] if then else res
+
+        else:
+            if self.selector:
+                res = (self.xpath_doc_one if root else self.xpath_one)(node)
+                res = res[0] if res else None
+            else:
+                res = node
+            return fn.reduce(lambda v, func: func(v), then, res) if then and res is not None else res
 
     def __call__(self, node):
+        if isinstance(node, etree._Element):
+            return self.__call_lxml(node)
+
         then = self.then
+        if self.selector and self.matcher is None:
+            self.compile()
 
         if self.many:
-            res = node.select(self.selector) if self.selector else node
+            res = self.matcher.select(node) if self.selector else node
             return [
                 fn.reduce(lambda v, func: func(v), then, r)
                 for r in res
@@ -23,7 +162,7 @@ class BsField:
             ] if then else res
 
         else:
-            res = node.select_one(self.selector) if self.selector else node
+            res = self.matcher.select_one(node) if self.selector else node
             return fn.reduce(lambda v, func: func(v), then, res) if then and res else res
 
     def __get__(self, obj, owner):
@@ -31,18 +170,470 @@ class BsField:
             return self
 
         if isinstance(obj, BsPageObj):
-            page = obj.page()
+            detached = obj.detached()
+            value = self.__call__(obj.page())
         else:
-            page = obj.as_source()
-        then = self.then
+            detached = owner._detached
+            plan = owner._plan.get(self)
+            value = obj._planned(self, *plan) if plan else self.__call__(obj.as_source())
+
+        if self.detached is not None:
+            detached = self.detached
+        return detach_value(value) if detached else value
+
+
+_COMPOUND = re.compile(r'^(?P<name>[a-zA-Z][\w-]*)?(?P<rest>(?:[.#][\w-]+)*)$')
+_COMBINATOR = re.compile(r'\s*([\s>+~])\s*')
+
+
+def _compound_rule(selector: str):
+    """
+    (name, classes, id) rule for leftmost compound of selector, None if it is not a plain tag/class/id compound
+    """
+    parts = _COMBINATOR.split(selector.strip(), maxsplit=1)
+    compound = parts[0]
+    if len(parts) > 1 and parts[1] in '+~':
+        return None
+
+    m = _COMPOUND.match(compound)
+    if not m or not compound:
+        return None
+
+    rest = re.findall(r'[.#][\w-]+', m.group('rest'))
+    ids = [el[1:] for el in rest if el[0] == '#']
+    if len(ids) > 1:
+        return None
+    name = m.group('name')
+    return (
+        name.lower() if name else None,
+        frozenset(el[1:] for el in rest if el[0] == '.'),
+        ids[0] if ids else None
+    )
+
+
+class SelectorStrainer(SoupStrainer):
+    """
+    Parse-only filter which builds only subtrees rooted at the leftmost compounds of CSS selectors
+
+    Every selector then matches inside kept subtrees the same way as in the
+    full document, i.e. for ".card .price" only ".card" elements are parsed.
+    """
+
+    def __init__(self, rules: tuple):
+        super(SelectorStrainer, self).__init__()
+        self.rules = rules
+
+    @classmethod
+    def from_selectors(cls, selectors) -> 'SelectorStrainer':
+        """
+        Strainer for selectors, None if any of them cannot be expressed as a strainer
+        """
+        rules = []
+        for selector in selectors:
+            if ',' in selector and ('(' in selector or '[' in selector):
+                return None
+            for part in selector.split(','):
+                rule = _compound_rule(part)
+                if rule is None:
+                    return None
+                rules.append(rule)
+        return cls(tuple(set(rules))) if rules else None
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        attrs = attrs or {}
+        classes = attrs.get('class') or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        for rule_name, rule_classes, rule_id in self.rules:
+            if (
+                (rule_name is None or rule_name == name) and
+                (rule_id is None or rule_id == attrs.get('id')) and
+                rule_classes.issubset(classes)
+            ):
+                return True
+        return False
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        # bs4 < 4.13 filters tags through search_tag
+        if isinstance(markup_name, Tag):
+            return markup_name if self.allow_tag_creation(None, markup_name.name, markup_name.attrs) else None
+        return markup_name if self.allow_tag_creation(None, markup_name, markup_attrs) else None
+
+
+def _derive_parse_only(klass):
+    selectors = []
+    for base in klass.__mro__:
+        for field_name, field in vars(base).items():
+            if isinstance(field, BsField):
+                if not field.selector:
+                    return None
+                selectors.append(field.selector)
+            elif isinstance(field, property) or (callable(field) and field_name.startswith('attr_')):
+                return None
+    return SelectorStrainer.from_selectors(selectors)
+
+
+class PageParseError(Exception):
+    """
+    Page of `parse_many` batch which failed to parse or crashed its worker
+    """
+
+    def __init__(self, index: int, page, cause):
+        super(PageParseError, self).__init__(f'Page #{index} failed: {cause!r}')
+        self.index = index
+        self.page = page
+        self.cause = cause
+
+
+def _parse_page(klass, page) -> dict:
+    if isinstance(page, PurePath):
+        page = Path(page).read_text(encoding='utf-8', errors='replace')
+    # every page is parsed once, nodes are detached so that no tree is pickled
+    with tree_cache.bypass():
+        return detach_value(klass(page).as_dict())
+
+
+def parse_many(klass, pages, workers: int = None, ordered: bool = True, errors: str = 'skip', window: int = None):
+    """
+    Parse pages with page object class in a process pool, yields `as_dict()` of every page
+
+    Workers receive raw HTML (or `pathlib` paths which they read themselves)
+    and send back plain dicts only, nodes become `DetachedNode`. Results are streamed as they complete.
+    When a worker process dies, in-flight pages are retried one by one, so
+    only the page which really crashes is reported as failed.
+
+    Parameters
+    ----------
+    klass : type
+        PageObject or BsPageObj subclass, has to be importable (defined at module level)
+    pages : iterable
+        HTML strings or paths to HTML files
+    workers : int
+        pool size, by default equal `os.cpu_count()`, 1 parses in-process
+    ordered : bool
+        keep input order, otherwise yield in completion order
+    errors : str
+        "skip" logs and skips failed pages, "return" yields `PageParseError` in place of the dict,
+        "raise" raises it
+    window : int
+        max pages in flight, by default 4 per worker
+
+    Yields
+    ------
+    dict or PageParseError
+    """
+    if errors not in ('skip', 'return', 'raise'):
+        raise ValueError(f'Unknown errors mode *{errors}*')
+
+    def failed(idx, page, cause):
+        error = PageParseError(idx, page, cause)
+        if errors == 'raise':
+            raise error
+        logger.warning(str(error))
+        return error if errors == 'return' else None
+
+    if workers == 1:
+        for idx, page in enumerate(pages):
+            try:
+                yield _parse_page(klass, page)
+            except Exception as exc:
+                error = failed(idx, page, exc)
+                if error is not None:
+                    yield error
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    window = window or 4 * (workers or os.cpu_count() or 1)
+    source = enumerate(pages)
+    suspects = deque()
+    pending = {}
+    completed = {}
+    next_idx = 0
+    exhausted = False
+
+    try:
+        while True:
+            if suspects:
+                if not pending:
+                    idx, page = suspects.popleft()
+                    pending[executor.submit(_parse_page, klass, page)] = idx, page, True
+            else:
+                while not exhausted and len(pending) + len(completed) < window:
+                    item = next(source, None)
+                    if item is None:
+                        exhausted = True
+                    else:
+                        pending[executor.submit(_parse_page, klass, item[1])] = item[0], item[1], False
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                idx, page, isolated = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as exc:
+                    broken = True
+                    if isolated:
+                        result = failed(idx, page, exc)
+                    else:
+                        suspects.append((idx, page))
+                        continue
+                except Exception as exc:
+                    result = failed(idx, page, exc)
+
+                if not ordered:
+                    if result is not None:
+                        yield result
+                    continue
+                completed[idx] = result
+
+            if broken:
+                suspects.extend((idx, page) for idx, page, _ in pending.values())
+                pending.clear()
+                executor.shutdown(wait=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
 
-        return self.__call__(page)
+            while next_idx in completed:
+                result = completed.pop(next_idx)
+                next_idx += 1
+                if result is not None:
+                    yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def row_matcher(selector: str):
+    """
+    Predicate telling whether a just closed element matches selector
+
+    Compounds are matched right to left against the element and its parsed
+    ancestors, so the cost does not depend on the size of the tree. Previous
+    rows are discarded while streaming, selectors depending on them (sibling
+    combinators, :nth-child) see only the current row.
+    """
+    tokens = split_selector(selector)
+    if not tokens:
+        raise Exception(f'Selector lists are not supported as *row* selector: {selector!r} ')
+    compounds = [etree.XPath(css_to_xpath(compound, prefix='self::')) for compound in tokens[::2]]
+    combinators = tokens[1::2]
+
+    def match(element: etree._Element, idx: int) -> bool:
+        if not compounds[idx](element):
+            return False
+        if idx == 0:
+            return True
+        combinator = combinators[idx - 1]
+        if combinator == '>':
+            candidates = (element.getparent(),)
+        elif combinator == '+':
+            candidates = (element.getprevious(),)
+        elif combinator == '~':
+            candidates = element.itersiblings(preceding=True)
+        else:
+            candidates = element.iterancestors()
+        return any(candidate is not None and match(candidate, idx - 1) for candidate in candidates)
+
+    last = len(compounds) - 1
+    plain = _COMPOUND.match(tokens[-1])
+    if not plain:
+        return lambda element: match(element, last)
+
+    # cheap check of a plain rightmost compound before any XPath evaluation
+    name = plain.group('name')
+    classes = set(re.findall(r'\.([\w-]+)', plain.group('rest')))
+
+    def matches(element: etree._Element) -> bool:
+        if name and element.tag != name:
+            return False
+        if classes and not classes <= set((element.get('class') or '').split()):
+            return False
+        return match(element, last)
+
+    return matches
+
+
+def _chunks(source, chunk_size: int):
+    if isinstance(source, (str, bytes)):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+
+def iter_rows(klass, source, chunk_size: int = ROW_CHUNK_SIZE):
+    """
+    Stream rows of a huge page without building the whole tree
+
+    Markup is fed into an incremental lxml parser, every element matching
+    `Meta.row` is extracted with `klass` as soon as its end tag arrives and
+    its subtree is discarded together with the previous rows, so memory stays
+    proportional to one row.
+
+    Parameters
+    ----------
+    klass: type
+        page object class declaring `Meta.row`, fields are evaluated inside the row
+    source: str | bytes | file object | iterable of chunks
+        page markup
+    chunk_size: int
+        bytes or chars read at once from str and file sources
+
+    Returns
+    -------
+    generator
+        detached field dict of every row, in document order
+    """
+    matches = klass._row_matcher
+    if matches is None:
+        raise Exception(f'No *row* selector is declared in {klass.__name__} Meta class ')
+
+    parser = etree.HTMLPullParser(events=('end',))
+
+    def rows():
+        for _, element in parser.read_events():
+            if matches(element):
+                yield detach_value(klass(element).as_dict())
+                element.clear(keep_tail=True)
+                # drop everything before the row on every level, e.g. wrappers of previous rows
+                for node in [element, *element.iterancestors()]:
+                    while node.getprevious() is not None:
+                        del node.getparent()[0]
+
+    for chunk in _chunks(source, chunk_size):
+        parser.feed(chunk)
+        yield from rows()
+    parser.close()
+    yield from rows()
+
+
+def split_selector(selector: str) -> list:
+    """
+    Split selector into [compound, combinator, compound, ...], None for selector lists
+    """
+    tokens = ['']
+    depth = 0
+    quote = None
+    for char in selector.strip():
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth == 0 and char == ',':
+            return None
+        elif depth == 0 and char in ' >+~':
+            if len(tokens) % 2:
+                tokens.append(' ')
+            if char != ' ':
+                tokens[-1] = char
+            continue
+
+        if len(tokens) % 2 == 0:
+            tokens.append('')
+        tokens[-1] += char
+    return tokens
+
+
+def _outermost(nodes: list) -> list:
+    ids = set(map(id, nodes))
+    return [
+        node
+        for node in nodes
+        if not any(
+            id(parent) in ids
+            for parent in (node.iterancestors() if isinstance(node, etree._Element) else node.parents)
+        )
+    ]
+
+
+def join_selector(tokens: list) -> str:
+    return ''.join(token if idx % 2 == 0 or token == ' ' else f' {token} ' for idx, token in enumerate(tokens))
+
+
+def plan_fields(fields: dict) -> dict:
+    """
+    Group fields by shared leading selector scope
+
+    Fields with at least two compounds are grouped by their first compound and
+    the scope is extended while every field of the group shares it. The split
+    is always made at a descendant combinator, so "scope rest" over the page is
+    the same as "rest" inside every outermost scope element.
+
+    Returns
+    -------
+    dict
+        scope selector -> {field name: remaining selector}
+    """
+    groups = {}
+    for name, field in fields.items():
+        tokens = split_selector(field.selector) if field.selector else None
+        if tokens and len(tokens) >= 3:
+            groups.setdefault(tokens[0], []).append((name, tokens))
+
+    plan = {}
+    for group in groups.values():
+        # fields which can be split only at a non-descendant combinator are left on the page
+        shared = -1
+        while len(group) >= 2:
+            # index of the last compound of the scope, at least one compound is left for every field
+            shared = min(len(tokens) for _, tokens in group) - 3
+            while shared > 0 and len(set(tuple(tokens[:shared + 1]) for _, tokens in group)) > 1:
+                shared -= 2
+            while shared > 0 and any(tokens[shared + 1] != ' ' for _, tokens in group):
+                shared -= 2
+            split = [(name, tokens) for name, tokens in group if tokens[shared + 1] == ' ']
+            if len(split) == len(group):
+                break
+            group = split
+        if len(group) < 2 or shared < 0:
+            continue
+
+        scope = join_selector(group[0][1][:shared + 1])
+        rest = dict((name, join_selector(tokens[shared + 2:])) for name, tokens in group)
+        plan.setdefault(scope, {}).update(rest)
+    return plan
 
 
 class PageObjMeta(type):
     def __new__(mcs, name, bases, attrs):
         klass = super().__new__(mcs, name, bases, attrs)
 
+        meta = klass.Meta
+        meta_row = getattr(meta, 'row', None)
+        meta_backend = getattr(meta, 'backend') if hasattr(meta, 'backend') else 'lxml' if meta_row else 'bs4'
+
+        if meta_backend not in BACKENDS:
+            raise Exception(f'Unknown backend *{meta_backend}* is declared in Meta class ')
+
+        if meta_row and meta_backend != 'lxml':
+            raise Exception('Streaming *row* selector requires lxml backend in Meta class ')
+        klass._row = meta_row
+        klass._row_matcher = row_matcher(meta_row) if meta_row else None
+
+        for field in attrs.values():
+            if isinstance(field, BsField):
+                field.compile(meta_backend)
+                for then in field.then:
+                    if isinstance(then, List):
+                        then.field.compile(meta_backend)
+
         fields = set(
             field_name
             for field_name, field
@@ -53,14 +644,13 @@ class PageObjMeta(type):
                 not (
                     field_name.startswith('_') or
                     field_name == 'Meta' or
-                    callable(field)
+                    callable(field) or
+                    isinstance(field, (classmethod, staticmethod))
                 )
 
             )
         )
 
-        meta = klass.Meta
-
         meta_fields = getattr(meta, 'fields') if hasattr(meta, 'fields') else None
         meta_ignore_fields = getattr(meta, 'ignore_fields') if hasattr(meta, 'ignore_fields') else None
         meta_parser = getattr(meta, 'parser') if hasattr(meta, 'parser') else 'lxml'
@@ -75,22 +665,249 @@ class PageObjMeta(type):
             fields -= set(meta_ignore_fields)
 
         klass._parser = meta_parser
+        klass._backend = meta_backend
         klass._export_fields = tuple(fields)
+
+        meta_parse_only = getattr(meta, 'parse_only') if hasattr(meta, 'parse_only') else None
+        if meta_backend != 'bs4' or meta_parser == 'html5lib' or not meta_parse_only:
+            klass._parse_only = None
+        elif isinstance(meta_parse_only, SoupStrainer):
+            klass._parse_only = meta_parse_only
+        elif meta_parse_only is True:
+            # opt-in: `then` chains walking parents or siblings would see a pruned tree
+            klass._parse_only = _derive_parse_only(klass)
+        else:
+            klass._parse_only = SelectorStrainer.from_selectors(
+                (meta_parse_only,) if isinstance(meta_parse_only, str) else meta_parse_only
+            )
+
+        klass._cache_trees = getattr(meta, 'cache_trees', True)
+        klass._detached = getattr(meta, 'detached', False)
+
+        klass._plan = {}
+        klass._scopes = {}
+        klass._plan_scope_limit = getattr(meta, 'plan_scope_limit', 8)
+        if getattr(meta, 'plan', True):
+            class_fields = {}
+            for base in reversed(klass.__mro__):
+                class_fields.update(
+                    (field_name, field) for field_name, field in vars(base).items() if isinstance(field, BsField)
+                )
+            for scope, rest in plan_fields(class_fields).items():
+                klass._scopes[scope] = BsField(scope, many=True).compile(meta_backend)
+                for field_name, selector in rest.items():
+                    if meta_backend == 'bs4':
+                        selector = ':scope ' + selector
+                    field = class_fields[field_name]
+                    klass._plan[field] = scope, BsField(selector, many=field.many).compile(meta_backend)
         return klass
 
 
+_XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+
+def parse_lxml(page) -> etree._Element:
+    """
+    Parse page into lxml tree, accepting what bs4 accepts: xml declarations with encoding and empty pages
+    """
+    if not isinstance(page, bytes):
+        # lxml refuses str markup declaring its encoding
+        page = _XML_DECLARATION.sub('', str(page), count=1)
+    try:
+        return lxml.html.document_fromstring(page)
+    except etree.ParserError:
+        return lxml.html.document_fromstring('<html></html>')
+
+
+class TreeCache:
+    """
+    LRU cache of parsed pages keyed by content hash, bounded by entry count and estimated tree size
+
+    It serves several extractors of the same page, only the last
+    `max_entries` pages are kept. Trees are keyed by (content hash, backend,
+    parser, parse_only), so an extractor always gets the same tree whatever
+    ran before it, and classes share a tree only when they parse the same
+    way. A cached tree is handed to every extractor of that page and must not
+    be modified: `then` callables calling `extract()`, `decompose()` etc. need
+    `Meta.cache_trees = False`.
+
+    Parameters
+    ----------
+    max_bytes: int
+        memory budget, markup length times `TREE_SIZE_FACTOR` of the backend is
+        charged per tree, 0 disables caching
+    max_entries: int
+        trees kept at once, 0 disables caching
+    """
+
+    def __init__(self, max_bytes: int = TREE_CACHE_BYTES, max_entries: int = TREE_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._trees = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._trees)
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self.size = self.hits = self.misses = 0
+
+    @contextmanager
+    def bypass(self):
+        """
+        Parse without looking up or storing trees in the current thread, for pages parsed once
+        """
+        previous = getattr(self._local, 'bypass', False)
+        self._local.bypass = True
+        try:
+            yield
+        finally:
+            self._local.bypass = previous
+
+    def parse(self, page: str, backend: str = 'bs4', parser: str = 'lxml', parse_only: SoupStrainer = None):
+        """
+        Parsed tree of page, parsing it only on cache miss
+        """
+        page = page if isinstance(page, bytes) else str(page)
+        if getattr(self._local, 'bypass', False) or self.max_entries <= 0 or self.max_bytes <= 0:
+            return self._parse(page, backend, parser, parse_only)
+
+        markup = page if isinstance(page, bytes) else page.encode('utf-8', 'surrogatepass')
+        digest = hashlib.blake2b(markup, digest_size=16).digest()
+        key = digest, backend, parser, parse_only
+
+        with self._lock:
+            entry = self._trees.get(key)
+            if entry is not None:
+                self._trees.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        tree = self._parse(page, backend, parser, parse_only)
+        cost = len(page) * TREE_SIZE_FACTOR.get(backend, 30)
+        if cost > self.max_bytes:
+            return tree
+        with self._lock:
+            if key not in self._trees:
+                self._trees[key] = tree, cost
+                self.size += cost
+            while self.size > self.max_bytes or len(self._trees) > self.max_entries:
+                _, (_, evicted) = self._trees.popitem(last=False)
+                self.size -= evicted
+        return tree
+
+    @staticmethod
+    def _parse(page, backend: str, parser: str, parse_only: SoupStrainer):
+        if backend == 'lxml':
+            return parse_lxml(page)
+        return BeautifulSoup(page, features=parser, parse_only=parse_only)
+
+
+tree_cache = TreeCache()
+
+
 class PageObject(metaclass=PageObjMeta):
 
+    @classmethod
+    def parse_many(cls, pages, workers: int = None, ordered: bool = True, errors: str = 'skip', window: int = None):
+        """
+        Parse pages in a process pool, see `parse_many`
+        """
+        return parse_many(cls, pages, workers=workers, ordered=ordered, errors=errors, window=window)
+
+    @classmethod
+    def iter_rows(cls, source, chunk_size: int = ROW_CHUNK_SIZE):
+        """
+        Stream field dicts of `Meta.row` elements, see `iter_rows`
+        """
+        return iter_rows(cls, source, chunk_size=chunk_size)
+
     def __init__(self, page: str):
-        if isinstance(page, BeautifulSoup) or isinstance(page, Tag):
+        # detached page objects destroy their own tree after as_dict, it is never shared
+        self.__owned = not isinstance(page, (BeautifulSoup, Tag, etree._Element)) and self._detached
+        if isinstance(page, (BeautifulSoup, Tag, etree._Element)):
             self.__page = page
+        elif self._cache_trees and not self._detached:
+            self.__page = tree_cache.parse(page, self._backend, self._parser, self._parse_only)
+        elif self._backend == 'lxml':
+            self.__page = parse_lxml(page)
         else:
-            self.__page = BeautifulSoup(str(page), features=self._parser)
+            self.__page = BeautifulSoup(
+                page if isinstance(page, bytes) else str(page), features=self._parser, parse_only=self._parse_only
+            )
         self.__value = None
+        self.__scopes = None
 
     def as_source(self):
         return self.__page
 
+    def _planned(self, field: BsField, scope: str, rest: BsField):
+        """
+        Evaluate field inside its planned scope, scope elements are resolved once per page
+
+        Pages with more than `Meta.plan_scope_limit` scope elements fall back to page-wide search.
+        """
+        if self.__scopes is None:
+            self.__scopes = {}
+        if scope not in self.__scopes:
+            scopes = self._scopes[scope](self.__page)
+            self.__scopes[scope] = _outermost(scopes) if len(scopes) <= self._plan_scope_limit else None
+        scopes = self.__scopes[scope]
+        if scopes is None:
+            # per-scope overhead outweighs a single page-wide search
+            return field(self.__page)
+        then = field.then
+
+        if field.many:
+            res = [node for node in scopes for node in rest(node)]
+            return [fn.reduce(lambda v, func: func(v), then, r) for r in res] if then else res
+
+        res = None
+        for node in scopes:
+            res = rest(node)
+            if res is not None:
+                break
+        return fn.reduce(lambda v, func: func(v), then, res) if then and res is not None else res
+
+    @classmethod
+    def explain(cls) -> str:
+        """
+        Print and return query plan: scopes resolved once and selectors evaluated inside them
+        """
+        class_fields = {}
+        for base in reversed(cls.__mro__):
+            class_fields.update(
+                (field_name, field) for field_name, field in vars(base).items() if isinstance(field, BsField)
+            )
+
+        lines = []
+        for scope in cls._scopes:
+            lines.append(f'scope {scope!r}')
+            lines += [
+                f'    {field_name}: {cls._plan[field][1].selector!r}'
+                for field_name, field in class_fields.items()
+                if field in cls._plan and cls._plan[field][0] == scope
+            ]
+
+        unplanned = [
+            f'    {field_name}: {field.selector!r}'
+            for field_name, field in class_fields.items()
+            if field not in cls._plan
+        ]
+        if unplanned:
+            lines += ['page'] + unplanned
+
+        plan = '\n'.join(lines)
+        print(plan)
+        return plan
+
     def __extract_key(self, field):
         attr = getattr(self, field)
         if callable(attr):
@@ -99,16 +916,28 @@ class PageObject(metaclass=PageObjMeta):
         return field, attr
 
     def as_dict(self):
-        if not self.__value:
-            self.__value = dict(
+        if self.__value is None:
+            value = dict(
                 self.__extract_key(field)
                 for field
                 in self._export_fields
             )
+            # properties and constants may hold nodes as well
+            self.__value = detach_value(value) if self._detached else value
+            if self.__owned:
+                release_tree(self.__page)
+                self.__page = self.__scopes = None
         return self.__value
 
     class Meta:
         parser: str = 'lxml'
+        backend: str = 'bs4'
+        parse_only = None
+        plan: bool = True
+        plan_scope_limit: int = 8
+        cache_trees: bool = True
+        detached: bool = False
+        row: str = None
         fields: tuple = None
         ignore_fields: tuple = None
 
@@ -119,9 +948,21 @@ class BsPageObj:
     def parser() -> str:
         return 'lxml'
 
+    @staticmethod
+    def backend() -> str:
+        return 'bs4'
+
+    @staticmethod
+    def cache_trees() -> bool:
+        return True
+
+    @staticmethod
+    def detached() -> bool:
+        return False
+
     @staticmethod
     def system_fields() -> tuple:
-        return 'parser', 'as_dict', 'page'
+        return 'parser', 'backend', 'cache_trees', 'detached', 'as_dict', 'page'
 
     @staticmethod
     def ignore_fields() -> tuple:
@@ -131,41 +972,88 @@ class BsPageObj:
     def transient_attrs(cls) -> set:
         return set(cls.system_fields() + cls.ignore_fields())
 
+    @classmethod
+    def parse_many(cls, pages, workers: int = None, ordered: bool = True, errors: str = 'skip', window: int = None):
+        """
+        Parse pages in a process pool, see `parse_many`
+        """
+        return parse_many(cls, pages, workers=workers, ordered=ordered, errors=errors, window=window)
+
+    @classmethod
+    def field_table(cls) -> tuple:
+        """
+        Attributes exported by `as_dict`, computed once per class
+        """
+        if '_field_table' not in cls.__dict__:
+            # list of BsFields (from class)
+            class_fields = set(
+                fld
+                for fld, inst
+                in cls.__dict__.items()
+                if isinstance(inst, BsField)
+            )
+
+            transient_attrs = cls.transient_attrs()
+
+            cls._field_table = tuple(
+                field
+                for field
+                in dir(cls)
+                if
+                (
+                    field in class_fields or
+                    field not in transient_attrs
+                ) and
+                not field.startswith('_') and
+                not field[0].isupper() and
+                (
+                    isinstance(inspect.getattr_static(cls, field), (BsField, property)) or
+                    not callable(getattr(cls, field))
+                )
+            )
+        return cls._field_table
+
     def __init__(self, page: str):
-        if isinstance(page, BeautifulSoup) or isinstance(page, Tag):
+        self.__owned = not isinstance(page, (BeautifulSoup, Tag, etree._Element)) and self.detached()
+        if isinstance(page, (BeautifulSoup, Tag, etree._Element)):
             self.__page = page
+        elif self.cache_trees() and not self.detached():
+            self.__page = tree_cache.parse(page, self.backend(), self.parser())
+        elif self.backend() == 'lxml':
+            self.__page = parse_lxml(page)
         else:
-            self.__page = BeautifulSoup(str(page), features=self.parser())
-        self.__class_fields = None
+            self.__page = BeautifulSoup(page if isinstance(page, bytes) else str(page), features=self.parser())
+        self.__value = None
 
     def page(self):
         return self.__page
 
     def as_dict(self):
-        # list of BsFields (from class)
-        class_fields = set(
-            fld
-            for fld, inst
-            in self.__class__.__dict__.items()
-            if isinstance(inst, BsField)
-        )
-
-        transient_attrs = self.transient_attrs()
+        if self.__value is None:
+            fields = self.field_table()
+            transient_attrs = self.transient_attrs()
+            instance_fields = [
+                field
+                for field
+                in vars(self)
+                if field not in fields and field not in transient_attrs and
+                not field.startswith('_') and not field[0].isupper()
+            ]
+            if instance_fields:
+                fields = sorted(fields + tuple(instance_fields))
 
-        return dict(
-            (field, getattr(self, field))
-            for field
-            in dir(self)
-            if
-            (
-                field in class_fields or
-                field not in transient_attrs
-
-            ) and
-            not field.startswith('_') and
-            not field[0].isupper() and
-            not callable(getattr(self, field))
-        )
+            value = {}
+            for field in fields:
+                attr = getattr(self, field)
+                if not callable(attr):
+                    value[field] = attr
+            if self.detached():
+                value = detach_value(value)
+            self.__value = value
+            if self.__owned:
+                release_tree(self.__page)
+                self.__page = None
+        return self.__value
 
 
 class Nested:
@@ -176,7 +1064,39 @@ class Nested:
         return self.page_obj_clazz(value).as_dict()
 
 
-inner_text = op.attrgetter('string')
+# attributes which bs4 splits into lists for html documents
+MULTI_VALUED_ATTRS = frozenset(('class', 'rel', 'rev', 'accept-charset', 'headers', 'accesskey', 'dropzone'))
+
+
+def lxml_string(node: etree._Element):
+    """
+    Same as bs4 `Tag.string`: text of the node if it is the only child (recursively), None otherwise
+    """
+    while True:
+        children = len(node)
+        if not children:
+            return node.text
+        if children > 1 or node.text:
+            return None
+        child = node[0]
+        if child.tail:
+            return None
+        if isinstance(child, etree._Comment):
+            return child.text
+        node = child
+
+
+def lxml_attr(node: etree._Element, attr, default=None):
+    value = node.get(attr)
+    if value is None:
+        return default
+    return value.split() if attr in MULTI_VALUED_ATTRS else value
+
+
+def inner_text(node):
+    if isinstance(node, etree._Element):
+        return lxml_string(node)
+    return node.string
 
 
 def stripped(value: str):
@@ -185,12 +1105,19 @@ def stripped(value: str):
 
 def as_attr(attr, default=None):
     def as_attr_wrapper(node):
+        if isinstance(node, etree._Element):
+            return lxml_attr(node, attr, default)
         return node.attrs.get(attr, default)
 
     return as_attr_wrapper
 
 
 def parse_href(node):
+    if isinstance(node, etree._Element):
+        return dict(
+            href=node.attrib['href'],
+            label=lxml_string(node).strip()
+        )
     return dict(
         href=node.attrs['href'],
         label=node.string.strip()
@@ -198,6 +1125,11 @@ def parse_href(node):
 
 
 def parse_img(node):
+    if isinstance(node, etree._Element):
+        return dict(
+            src=node.attrib['src'],
+            label=node.get('alt')
+        )
     return dict(
         src=node.attrs['src'],
         label=node.attrs.get('alt') if node else None
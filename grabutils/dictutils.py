@@ -1,12 +1,618 @@
+import codecs
+import json
+import math
 import re
+import threading
+from array import array, typecodes
+from bisect import bisect_left
+from collections import OrderedDict
 from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+PATH_CACHE_SIZE = 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+KEY_INDEX_CACHE_SIZE = 64
+KEY_INDEX_MIN_SIZE = 32
+KEY_INDEX_MAX_PREFIXES = 64
+
+
+_SLICE = re.compile(r'^-?\d*:-?\d*(:-?\d*)?$')
+
+
+def _compile_key(el: str):
+    if el.isdecimal():
+        return int(el)
+    if el == '*':
+        return slice(None)
+    if _SLICE.match(el):
+        return slice(*(int(v) if v else None for v in el.split(':')))
+    return el
+
+
+class dictpath:
+    """
+    Precompiled dotted path, i.e. "path.to.0.content"
+
+    Numeric segments are converted to int once at compile time, so walking
+    the path is a plain loop over prepared keys with the same None-propagation
+    rules as `dictview.__getitem__`.
+
+    Segments "*" (every value) and "start:stop:step" (slice of a sequence) make
+    the path fan out, such paths produce a lazy generator of matches, i.e.
+    "results.*.offers.0:3.price".
+    """
+
+    __slots__ = ('path', 'keys', 'fanout')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.keys = tuple(_compile_key(el) for el in path.split('.'))
+        self.fanout = any(isinstance(key, slice) for key in self.keys)
+
+    def __repr__(self):
+        return f'dictpath({self.path!r})'
+
+    def __call__(self, data):
+        if self.fanout:
+            return self.iter(data)
+        for key in self.keys:
+            data = _GETTERS.get(type(data), _step)(data, key)
+        return data
+
+    def iter(self, data):
+        """
+        Lazily yield every match, plain path yields single value
+        """
+        return self.__iter(data, 0)
+
+    def __iter(self, data, idx: int):
+        keys = self.keys
+        while idx < len(keys):
+            key = keys[idx]
+            idx += 1
+            if isinstance(key, slice):
+                for item in _fanout(data, key):
+                    yield from self.__iter(item, idx)
+                return
+            data = _GETTERS.get(type(data), _step)(data, key)
+        yield data
+
+
+def _fanout(data, key: slice):
+    if data is None or isinstance(data, (str, bytes)):
+        return ()
+    if hasattr(data, 'values'):
+        values = data.values()
+        if key == slice(None):
+            return values
+        start, stop, step = key.indices(len(data))
+        if step < 0:
+            return list(values)[key]
+        return islice(values, start, stop, step)
+    if key == slice(None):
+        return data if hasattr(data, '__iter__') else ()
+    if hasattr(data, '__getitem__') and hasattr(data, '__len__'):
+        return map(data.__getitem__, range(*key.indices(len(data))))
+    return ()
+
+
+def _step(data, key):
+    if data is None:
+        return None
+    if hasattr(data, '__getitem__'):
+        try:
+            return data[key]
+        except (IndexError, KeyError):
+            return None
+    try:
+        return getattr(data, key)
+    except AttributeError:
+        return None
+
+
+def _get_none(data, key):
+    return None
+
+
+def _get_sequence(data, key):
+    try:
+        return data[key]
+    except IndexError:
+        return None
+
+
+def _get_set(data, key):
+    return None
+
+
+# Exact container type -> getter, anything else goes through generic `_step`
+_GETTERS = {
+    type(None): _get_none,
+    dict: dict.get,
+    list: _get_sequence,
+    tuple: _get_sequence,
+    set: _get_set,
+    frozenset: _get_set,
+}
+
+
+class dictcursor:
+    """
+    Allocation-free traversal over nested containers
+
+    The cursor keeps only current value and moves itself on every hop, so
+    `cursor.a.b[0].c` does not create intermediate objects. Container type is
+    dispatched once per hop through a type-keyed table, None is propagated the
+    same way as in `dictview`.
+    """
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def reset(self, value) -> 'dictcursor':
+        self.value = value
+        return self
+
+    def __repr__(self):
+        return f'dictcursor({self.value!r})'
+
+    def __getitem__(self, item) -> 'dictcursor':
+        data = self.value
+        if isinstance(item, re.Pattern):
+            self.value = _search(data, item)
+        else:
+            self.value = _GETTERS.get(type(data), _step)(data, item)
+        return self
+
+    def __getattr__(self, item: str) -> 'dictcursor':
+        if item.startswith('__'):
+            raise AttributeError(item)
+        data = self.value
+        self.value = _GETTERS.get(type(data), _step)(data, item)
+        return self
+
+
+def _search(data, pattern: re.Pattern) -> list:
+    if isinstance(data, dict):
+        return [v for k, v in data.items() if pattern.search(k)]
+    elif isinstance(data, (list, tuple, set)):
+        return [v for v in data if pattern.search(v)]
+    else:
+        return []
+
+
+def _literal_prefixes(ops, prefixes: list) -> (list, bool):
+    """
+    Extend prefixes with literal start of parsed regex, returns (prefixes, whole ops were literal)
+    """
+    for op, av in ops:
+        if op == sre_parse.LITERAL:
+            prefixes = [p + chr(av) for p in prefixes]
+            continue
+
+        if op == sre_parse.SUBPATTERN and not (av[1] or av[2]):
+            prefixes, complete = _literal_prefixes(av[-1], prefixes)
+            if prefixes is None:
+                return None, False
+        elif op == sre_parse.BRANCH:
+            extended, complete = [], True
+            for branch in av[1]:
+                branch_prefixes, branch_complete = _literal_prefixes(branch, prefixes)
+                if branch_prefixes is None:
+                    return None, False
+                extended += branch_prefixes
+                complete = complete and branch_complete
+            prefixes = extended
+        elif op == sre_parse.IN and all(el_op == sre_parse.LITERAL for el_op, _ in av):
+            prefixes = [p + chr(c) for p in prefixes for _, c in av]
+            complete = True
+        else:
+            return prefixes, False
+
+        if len(prefixes) > KEY_INDEX_MAX_PREFIXES:
+            return None, False
+        if not complete:
+            return prefixes, False
+
+    return prefixes, True
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def literal_prefixes(pattern: re.Pattern) -> tuple:
+    """
+    Literal prefixes which every match of anchored pattern starts with, i.e. "^(ab|cd)x" -> ("abx", "cdx")
+
+    Returns None if pattern is not anchored at the beginning or prefixes cannot be extracted.
+    """
+    if not isinstance(pattern.pattern, str) or pattern.flags & (re.IGNORECASE | re.MULTILINE):
+        return None
+
+    ops = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    if not ops or ops[0] not in (
+        (sre_parse.AT, sre_parse.AT_BEGINNING),
+        (sre_parse.AT, sre_parse.AT_BEGINNING_STRING),
+    ):
+        return None
+
+    prefixes, _ = _literal_prefixes(ops[1:], [''])
+    if not prefixes or '' in prefixes:
+        return None
+    return tuple(prefixes)
+
+
+class keyindex:
+    """
+    Sorted index over string keys of dict (or string elements of list, tuple, set)
+
+    Sorted keys serve as a flattened prefix trie: every literal prefix of a
+    regex is resolved with a binary search, so only candidate keys are matched.
+
+    Cached indexes (`_indexed_search`) are validated against the current keys
+    on every lookup, a list copy and comparison which is still O(n) but runs
+    in C, the index saves the per key regex matching only.
+    """
+
+    __slots__ = ('size', 'items', 'keys', 'positions', 'other')
+
+    def __init__(self, data):
+        self.size = len(data)
+        self.items = list(data.keys() if isinstance(data, dict) else data)
+
+        pairs = []
+        self.other = []
+        for pos, key in enumerate(self.items):
+            if isinstance(key, str):
+                pairs.append((key, pos))
+            else:
+                self.other.append(pos)
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.positions = [pos for _, pos in pairs]
+
+    def candidates(self, pattern: re.Pattern) -> list:
+        """
+        Positions of keys which may match pattern, in original order, or None if index does not help
+        """
+        prefixes = literal_prefixes(pattern)
+        if prefixes is None:
+            return None
+
+        keys = self.keys
+        found = set(self.other)
+        for prefix in prefixes:
+            idx = bisect_left(keys, prefix)
+            while idx < len(keys) and keys[idx].startswith(prefix):
+                found.add(self.positions[idx])
+                idx += 1
+        return sorted(found)
+
+    def search(self, data, pattern: re.Pattern) -> list:
+        positions = self.candidates(pattern)
+        if positions is None:
+            return _search(data, pattern)
+
+        items = self.items
+        if isinstance(data, dict):
+            return [data[items[pos]] for pos in positions if pattern.search(items[pos])]
+        return [items[pos] for pos in positions if pattern.search(items[pos])]
+
+
+_KEY_INDEXES = OrderedDict()
+_KEY_INDEXES_LOCK = threading.Lock()
+
+
+def _indexed_search(data, pattern: re.Pattern) -> list:
+    if not isinstance(data, (dict, list, tuple, set)) or len(data) < KEY_INDEX_MIN_SIZE:
+        return _search(data, pattern)
+
+    with _KEY_INDEXES_LOCK:
+        entry = _KEY_INDEXES.get(id(data))
+        if entry is not None:
+            _KEY_INDEXES.move_to_end(id(data))
+
+    # same-size key swaps leave the size untouched, so keys are compared as well
+    if entry is None or entry[0] is not data or entry[1].size != len(data) or entry[1].items != list(data):
+        entry = data, keyindex(data)
+        with _KEY_INDEXES_LOCK:
+            _KEY_INDEXES[id(data)] = entry
+            while len(_KEY_INDEXES) > KEY_INDEX_CACHE_SIZE:
+                _KEY_INDEXES.popitem(last=False)
+
+    return entry[1].search(data, pattern)
+
+
+class projectplan:
+    """
+    Projection plan for several dotted paths at once
+
+    Paths are merged into a trie, so every shared prefix is walked only once
+    per record, i.e. "data.item.id" and "data.item.name" resolve "data.item"
+    a single time. Fan-out paths share the prefix up to the first wildcard,
+    the rest of the path is projected as a lazy generator of matches.
+    """
+
+    __slots__ = ('fields', 'root')
+
+    def __init__(self, fields: tuple):
+        self.fields = tuple(name for name, _ in fields)
+
+        trie = {}
+        for name, path in fields:
+            node = trie
+            suffix = None
+            segments = path.split('.')
+            for idx, key in enumerate(compile_path(path).keys):
+                if isinstance(key, slice):
+                    suffix = compile_path('.'.join(segments[idx:]))
+                    break
+                node = node.setdefault(key, {})
+            node.setdefault(None, []).append((name, suffix))
+
+        self.root = self.__freeze(trie)
+
+    @classmethod
+    def __freeze(cls, node: dict) -> tuple:
+        return (
+            tuple(node.get(None, ())),
+            tuple((key, cls.__freeze(child)) for key, child in node.items() if key is not None)
+        )
+
+    def __walk(self, node: tuple, data, out: dict):
+        names, children = node
+        for name, suffix in names:
+            out[name] = suffix.iter(data) if suffix else data
+        if data is None:
+            return
+        getter = _GETTERS.get(type(data), _step)
+        for key, child in children:
+            self.__walk(child, getter(data, key), out)
+
+    def into(self, data, out: dict) -> dict:
+        """
+        Project data into existing dict, keys which were not reached are left untouched
+        """
+        self.__walk(self.root, data, out)
+        return out
+
+    def __call__(self, data) -> dict:
+        return self.into(data, dict.fromkeys(self.fields))
+
+
+def _new_column(dtype, size: int, fill):
+    """
+    Column for `dictview.project_columns`, preallocated when size is known, returns (column, fill)
+    """
+    if dtype is None:
+        return ([fill] * size if size is not None else []), fill
+
+    if isinstance(dtype, str) and len(dtype) == 1 and dtype in typecodes:
+        if fill is None:
+            fill = math.nan if dtype in 'fd' else 0
+        return (array(dtype, [fill]) * size if size is not None else array(dtype)), fill
+
+    if np is None:
+        raise ImportError(f'numpy is required for dtype {dtype!r}, install grabutils[numpy]')
+    if fill is None:
+        fill = math.nan if np.dtype(dtype).kind in 'fc' else 0
+    return (np.full(size, fill, dtype=dtype) if size is not None else []), fill
+
+
+_NON_WS = re.compile(r'\S')
+_STRUCT_CHAR = re.compile(r'[\[\]{}"]')
+_STRING_CHAR = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[,\]}\s]')
+
+
+class jsonstream:
+    """
+    Incremental JSON reader which materializes only subtrees selected by a projection trie
+
+    Everything outside of requested paths is skipped on the character level,
+    so memory is bounded by the largest matched subtree and the read chunk,
+    not by document size.
+    """
+
+    def __init__(self, fileobj, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.offset = 0
+        self.capture = None
+        self.capture_start = 0
+
+    def __more(self) -> bool:
+        chunk = self.fileobj.read(self.chunk_size)
+        while isinstance(chunk, bytes):
+            raw = chunk
+            chunk = self.decoder.decode(raw, final=not raw)
+            if chunk or not raw:
+                break
+            # only a part of a multibyte char was read
+            chunk = self.fileobj.read(self.chunk_size)
+        if not chunk:
+            return False
+        if self.capture is not None:
+            self.capture.append(self.buf[self.capture_start:])
+            self.capture_start = 0
+        self.offset += len(self.buf)
+        self.buf = chunk
+        self.pos = 0
+        return True
+
+    def __search(self, pattern: re.Pattern):
+        while True:
+            m = pattern.search(self.buf, self.pos)
+            if m:
+                return m
+            self.pos = len(self.buf)
+            if not self.__more():
+                return None
+
+    def peek(self) -> str:
+        m = self.__search(_NON_WS)
+        if not m:
+            return ''
+        self.pos = m.start()
+        return self.buf[self.pos]
+
+    def expect(self, char: str):
+        c = self.peek()
+        if c != char:
+            raise ValueError(f'Expected {char!r}, got {c!r}')
+        self.pos += 1
+
+    def __skip_string(self):
+        while True:
+            m = self.__search(_STRING_CHAR)
+            if not m:
+                raise ValueError('Unterminated string')
+            self.pos = m.end()
+            if m.group() == '"':
+                return
+            if self.pos >= len(self.buf) and not self.__more():
+                raise ValueError('Unterminated string')
+            self.pos += 1
+
+    def skip_value(self):
+        c = self.peek()
+        if not c:
+            raise ValueError('Unexpected end of document')
+        if c == '"':
+            self.pos += 1
+            self.__skip_string()
+        elif c in '[{':
+            depth = 0
+            while True:
+                m = self.__search(_STRUCT_CHAR)
+                if not m:
+                    raise ValueError('Unexpected end of document')
+                self.pos = m.end()
+                c = m.group()
+                if c == '"':
+                    self.__skip_string()
+                elif c in '[{':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:
+            m = self.__search(_SCALAR_END)
+            if m:
+                self.pos = m.start()
+
+    def read_value(self):
+        self.peek()
+        self.capture = []
+        self.capture_start = self.pos
+        try:
+            self.skip_value()
+            self.capture.append(self.buf[self.capture_start:self.pos])
+            return json.loads(''.join(self.capture))
+        finally:
+            self.capture = None
+
+    def items(self):
+        """
+        Iterate over current object or array, yields key (or index) and leaves position at its value
+        """
+        c = self.peek()
+        if c not in ('{', '['):
+            return
+        self.pos += 1
+        close = '}' if c == '{' else ']'
+        if self.peek() == close:
+            self.pos += 1
+            return
+
+        idx = 0
+        while True:
+            if c == '{':
+                key = self.read_value()
+                self.expect(':')
+            else:
+                key = idx
+                idx += 1
+
+            start = self.offset + self.pos
+            yield key
+            if self.offset + self.pos == start:
+                self.skip_value()
+
+            sep = self.peek()
+            self.pos += 1
+            if sep == close:
+                return
+            if sep != ',':
+                raise ValueError(f'Expected {close!r} or \',\', got {sep!r}')
+
+    def build(self, node: tuple):
+        """
+        Materialize current value restricted to a trie node, arrays are returned as {index: value} dicts
+        """
+        names, children = node
+        if names or self.peek() not in ('{', '['):
+            return self.read_value()
+
+        out = {}
+        for key in self.items():
+            child = children.get(key)
+            if child is not None:
+                out[key] = self.build(child)
+        return out
+
+    def seek(self, keys: tuple) -> bool:
+        """
+        Descend into the document by path keys, returns False if path does not exist
+        """
+        for key in keys:
+            for item in self.items():
+                if item == key:
+                    break
+            else:
+                return False
+        return True
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_path(path: str) -> dictpath:
+    """
+    Compile dotted path into `dictpath`, results are kept in bounded LRU cache
+    """
+    return dictpath(path)
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_plan(fields: tuple) -> projectplan:
+    """
+    Compile tuple of (name, path) pairs into `projectplan`, results are kept in bounded LRU cache
+    """
+    return projectplan(fields)
 
 
 class dictview:
 
-    def __init__(self, data, inline=False):
+    compile = staticmethod(compile_path)
+
+    def __init__(self, data, inline=False, indexed=False):
         self.__container_data = data
         self.inline = inline
+        self.indexed = indexed
 
     @property
     def value(self):
@@ -33,22 +639,164 @@ class dictview:
         Returns
         -------
         dictview
+            or lazy generator of dictviews if path contains "*" or slice segments
         """
+        path = compile_path(path)
+        if path.fanout:
+            return (dictview(value, inline=self.inline, indexed=self.indexed) for value in path.iter(self.value))
+        return dictview(path(self.value), inline=self.inline, indexed=self.indexed)
 
-        d = dictview(self.value, inline=True)
-        for el in path.split('.'):
-            if re.match(r'^\d+$', el):
-                d = d[int(el)]
-            else:
-                d = d[el]
-        d.inline = self.inline
-        return d
-
-    def project(self, **kwargs):
-        return dict(
-            (k, self.scan(path).value)
-            for k, path in kwargs.items()
-        )
+    def cursor(self) -> dictcursor:
+        """
+        Allocation-free `dictcursor` positioned at current value
+        """
+        return dictcursor(self.value)
+
+    def iscan(self, path: str):
+        """
+        Lazily yield raw values matched by path, without wrapping them into dictview
+
+        Parameters
+        ----------
+        path : str
+            dotted path, may contain "*" and "start:stop:step" segments
+
+        Yields
+        ------
+        any
+        """
+        return compile_path(path).iter(self.value)
+
+    def project(self, **kwargs) -> dict:
+        return compile_plan(tuple(kwargs.items()))(self.value)
+
+    @staticmethod
+    def project_many(records, **kwargs):
+        """
+        Project every record from iterable with single shared plan
+
+        Parameters
+        ----------
+        records : iterable
+            dicts (or dictviews) to project
+        kwargs
+            output key to dotted path mapping, same as in `project`
+
+        Yields
+        ------
+        dict
+        """
+        plan = compile_plan(tuple(kwargs.items()))
+        for record in records:
+            yield plan(record.value if isinstance(record, dictview) else record)
+
+    @staticmethod
+    def project_columns(records, dtypes: dict = None, fill=None, **kwargs) -> dict:
+        """
+        Project iterable of records into columns, one column per output key
+
+        Parameters
+        ----------
+        records : iterable
+            dicts (or dictviews) to project, columns are preallocated when it has len()
+        dtypes : dict
+            output key to dtype mapping, one-char `array` typecode ("d", "q", ...)
+            gives `array.array`, anything else is treated as numpy dtype,
+            keys without dtype are collected into plain lists
+        fill : any
+            value for missing (None) paths, either scalar or per key dict,
+            typed columns default to nan for floats and 0 otherwise
+        kwargs
+            output key to dotted path mapping, same as in `project`
+
+        Returns
+        -------
+        dict
+        """
+        plan = compile_plan(tuple(kwargs.items()))
+        dtypes = dtypes or {}
+        size = len(records) if hasattr(records, '__len__') else None
+
+        columns = {}
+        layout = []
+        for name in plan.fields:
+            column, default = _new_column(
+                dtypes.get(name), size,
+                fill.get(name) if isinstance(fill, dict) else fill
+            )
+            columns[name] = column
+            layout.append((name, column, default))
+
+        blank = dict.fromkeys(plan.fields)
+        out = dict(blank)
+        for idx, record in enumerate(records):
+            out.update(blank)
+            plan.into(record.value if isinstance(record, dictview) else record, out)
+            for name, column, default in layout:
+                value = out[name]
+                if value is None:
+                    value = default
+                if size is None:
+                    column.append(value)
+                else:
+                    column[idx] = value
+
+        if size is None:
+            for name, column, _ in layout:
+                dtype = dtypes.get(name)
+                if isinstance(column, list) and dtype is not None:
+                    columns[name] = np.array(column, dtype=dtype)
+
+        return columns
+
+    @staticmethod
+    def stream(fileobj, paths, prefix: str = None, lines: bool = False, chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Project records from JSON document without loading it into memory
+
+        Parameters
+        ----------
+        fileobj : file-like
+            text or binary (utf-8) file object
+        paths : dict or iterable
+            output key to dotted path mapping, same as in `project`,
+            plain iterable of paths uses paths as output keys
+        prefix : str
+            dotted path to the records inside document, i.e. "data.items",
+            array at this path yields a record per element, anything else yields a single record
+        lines : bool
+            JSON-lines input, every top-level value is a record
+        chunk_size : int
+            read size
+
+        Yields
+        ------
+        dict
+        """
+        if not isinstance(paths, dict):
+            paths = dict((path, path) for path in paths)
+        plan = compile_plan(tuple(paths.items()))
+
+        def lookup(node):
+            names, children = node
+            return names, dict((key, lookup(child)) for key, child in children)
+
+        trie = lookup(plan.root)
+        reader = jsonstream(fileobj, chunk_size=chunk_size)
+
+        if lines:
+            while reader.peek():
+                yield plan(reader.build(trie))
+            return
+
+        if prefix and not reader.seek(compile_path(prefix).keys):
+            return
+
+        if reader.peek() == '[':
+            for _ in reader.items():
+                yield plan(reader.build(trie))
+        elif reader.peek():
+            yield plan(reader.build(trie))
 
     def __str__(self):
         return str(self.__container_data)
@@ -83,21 +831,16 @@ class dictview:
         return self._wrap_output(ret)
 
     def __search(self, pattern: re.Pattern) -> list:
-        if isinstance(self.__container_data, dict):
-            return [v for k, v in self.__container_data.items() if pattern.search(k)]
-        elif isinstance(self.__container_data, list) or isinstance(self.__container_data, tuple):
-            return [v for v in self.__container_data if pattern.search(v)]
-        elif isinstance(self.__container_data, set):
-            return [v for v in self.__container_data if pattern.search(v)]
-        else:
-            return []
+        if self.indexed:
+            return _indexed_search(self.__container_data, pattern)
+        return _search(self.__container_data, pattern)
 
     def _wrap_output(self, output):
         if self.inline:
             self.__container_data = output
             return self
 
-        return dictview(output, inline=self.inline)
+        return dictview(output, inline=self.inline, indexed=self.indexed)
 
     def __getitem__(self, item) -> 'dictview':
         if self.__container_data is None:
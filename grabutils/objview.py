@@ -1,4 +1,26 @@
+import multiprocessing as mp
+import os
+from array import array
+from collections import deque
 from functools import reduce
+from itertools import chain, count, islice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# inputs smaller than this are exported in-process, a pool does not pay off
+PARALLEL_MIN_RECORDS = 50000
+# chunks in flight per pool worker
+EXPORT_WINDOW_PER_WORKER = 2
+
+# astype -> `array` typecode for columnar export
+NUMERIC_TYPECODES = {
+    int: 'q',
+    float: 'd',
+    bool: 'b',
+}
 
 
 class Project:
@@ -8,6 +30,7 @@ class Project:
         self.silent = kwargs.get('silent', False)
         self.default = kwargs.get('default')
         self.conv = kwargs.get('astype')
+        self.cache = kwargs.get('cache', False)
         # self.allow_none = kwargs.get('allow_none', True)
 
     @staticmethod
@@ -34,6 +57,8 @@ class Project:
 
     def __get__(self, obj, owner) -> any:
         if hasattr(obj, '_get_data'):
+            if self.field in getattr(obj, '_cached_fields', ()):
+                return obj._memoize(self.field, self)
             return self(getattr(obj, '_get_data')())
         else:
             return self
@@ -61,11 +86,155 @@ class Callable(Project):
 
     def __get__(self, obj, owner) -> any:
         if hasattr(obj, '_get_data'):
+            if self.field in getattr(obj, '_cached_fields', ()):
+                return obj._memoize(self.field, self)
             return self(getattr(obj, '_get_data')())
         else:
             return self
 
 
+def _is_plain(field, base) -> bool:
+    return all(
+        getattr(type(field), method) is getattr(base, method)
+        for method in ('__call__', '__get__', 'iter_path', 'get_field')
+    )
+
+
+class ExtractorBuilder:
+    """
+    Generates single function which extracts all export fields of ObjectView class
+
+    `Project` paths are inlined as direct subscripts, `Zip` and `Callable` are
+    expanded in place. Any failure of inlined expression falls back to the
+    descriptor itself, so errors and `silent`/`default` handling stay the same.
+    """
+
+    def __init__(self):
+        self.namespace = {}
+        self.ids = count()
+
+    def ref(self, obj) -> str:
+        # exact types only, repr of subclasses (e.g. str Enum members) and nan floats is not source
+        if obj is None or type(obj) in (bool, int, str):
+            return repr(obj)
+        name = f'_c{next(self.ids)}'
+        self.namespace[name] = obj
+        return name
+
+    def expression(self, field: Project, convert: bool = True) -> (str, bool):
+        """
+        Python expression over `data` for field, and whether it contains inlined subscripts
+        """
+        if _is_plain(field, Project):
+            expr = 'data' + ''.join(f'[{self.ref(key)}]' for key in field.path)
+            inlined = True
+        elif _is_plain(field, Zip):
+            parts = [self.expression(el) for el in field.path]
+            expr = f'zip({", ".join(el for el, _ in parts)})'
+            inlined = any(el for _, el in parts)
+        elif _is_plain(field, Callable):
+            expr = f'{self.ref(field.path[0])}(data)'
+            inlined = False
+        else:
+            return f'{self.ref(field)}(data)', False
+
+        if field.conv and convert:
+            expr = f'{self.ref(field.conv)}({expr})'
+        return expr, inlined
+
+    def build(self, klass, fields: tuple, raw: frozenset = frozenset()):
+        """
+        Extractor function for fields, `astype` of fields listed in raw is left to the caller
+
+        Fallback path of raw fields returns already converted value, so their
+        `astype` has to be idempotent (numeric types are).
+        """
+        lines = ['def extract(view, data):', '    out = {}']
+        for name in fields:
+            field = klass.__dict__.get(name)
+            key = name.replace('attr_', '', 1) if name.startswith('attr_') else name
+
+            if isinstance(field, Project) and not any(_is_plain(field, base) for base in (Project, Zip, Callable)):
+                lines.append(f'    out[{key!r}] = view.{name}')
+            elif isinstance(field, Project):
+                expr, inlined = self.expression(field, convert=name not in raw)
+                if inlined:
+                    lines += [
+                        '    try:',
+                        f'        out[{key!r}] = {expr}',
+                        '    except Exception:',
+                        f'        out[{key!r}] = {self.ref(field)}(data)',
+                    ]
+                else:
+                    lines.append(f'    out[{key!r}] = {expr}')
+            elif name.startswith('attr_') and callable(field):
+                lines.append(f'    out[{key!r}] = view.{name}(data)')
+            else:
+                lines.append(f'    out[{key!r}] = view.{name}')
+        lines.append('    return out')
+
+        exec(compile('\n'.join(lines), f'<extractor {klass.__qualname__}>', 'exec'), self.namespace)
+        extract = self.namespace['extract']
+        extract.needs_view = any('view.' in line for line in lines[1:])
+        return extract
+
+
+def _numeric_dtype(field) -> any:
+    """
+    astype of field if it maps to a numeric column dtype, None otherwise
+    """
+    if not isinstance(field, Project) or not (_is_plain(field, Project) or _is_plain(field, Callable)):
+        return None
+    if field.conv in NUMERIC_TYPECODES:
+        return field.conv
+    if np is not None and isinstance(field.conv, type) and issubclass(field.conv, np.number):
+        return field.conv
+    return None
+
+
+def _to_column(values: list, dtype):
+    if dtype is None:
+        return values
+    if np is not None:
+        if dtype is bool:
+            return np.fromiter(map(bool, values), dtype=bool, count=len(values))
+        # numpy turns None into nan where astype raises, such columns are converted per value
+        if None not in values:
+            try:
+                return np.array(values, dtype=dtype)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        values = list(map(dtype, values))
+        try:
+            return np.array(values, dtype=dtype)
+        except OverflowError:
+            return np.array(values, dtype=object)
+    values = list(map(dtype, values))
+    try:
+        return array(NUMERIC_TYPECODES[dtype], values)
+    except OverflowError:
+        return values
+
+
+def _export_chunk(args) -> list:
+    klass, chunk, astuple = args
+    return list(klass._export_chunk(chunk, astuple))
+
+
+def _getattr_extractor(fields: tuple):
+    keys = tuple(
+        (name, name.replace('attr_', '', 1) if name.startswith('attr_') else name)
+        for name in fields
+    )
+
+    def extract(view, data):
+        return dict(
+            (key, getattr(view, name)(data) if name.startswith('attr_') else getattr(view, name))
+            for name, key in keys
+        )
+
+    extract.needs_view = True
+    return extract
 
 
 class ObjectViewMeta(type):
@@ -90,7 +259,8 @@ class ObjectViewMeta(type):
                 not (
                     field_name.startswith('_') or
                     field_name == 'Meta' or
-                    callable(field)
+                    callable(field) or
+                    isinstance(field, (classmethod, staticmethod))
                 )
 
             )
@@ -109,25 +279,211 @@ class ObjectViewMeta(type):
         if meta_ignore_fields:
             fields -= set(meta_ignore_fields)
 
-        klass._export_fields = tuple(fields)
+        meta_cache = getattr(meta, 'cache') if hasattr(meta, 'cache') else False
+        if meta_cache is True:
+            cached_fields = set(
+                field_name for field_name, field in attrs.items() if isinstance(field, Project)
+            ) | dynamic_fields
+        else:
+            cached_fields = set(
+                field_name for field_name, field in attrs.items() if isinstance(field, Project) and field.cache
+            ) | set(meta_cache or ())
+
+        klass._export_fields = tuple(field_name for field_name in attrs if field_name in fields)
         klass._dynamic_fields = dynamic_fields
+        klass._cached_fields = frozenset(cached_fields)
+
+        if getattr(meta, 'compiled', True):
+            klass._extract = staticmethod(ExtractorBuilder().build(klass, klass._export_fields))
+        else:
+            klass._extract = staticmethod(_getattr_extractor(klass._export_fields))
         return klass
 
 
 class ObjectView(metaclass=ObjectViewMeta):
+    __slots__ = ('__data', '__cache')
+
     def __init__(self, data):
         self.__data = data
+        self.__cache = {}
         # for fld, fn in self._dynamic_fields.items():
         #     setattr(self, fld, Callable(fn))
 
     def _get_data(self):
         return self.__data
 
+    def _memo(self) -> dict:
+        # created lazily, subclasses may override __init__ without calling super()
+        try:
+            return self.__cache
+        except AttributeError:
+            self.__cache = {}
+            return self.__cache
+
+    def _memoize(self, field: str, fn):
+        cache = self._memo()
+        if field in cache:
+            return cache[field]
+        value = cache[field] = fn(self._get_data())
+        return value
+
+    def invalidate(self, *fields):
+        """
+        Drop memoized values of fields, all of them if no fields given
+        """
+        cache = self._memo()
+        if not fields:
+            cache.clear()
+        for field in fields:
+            cache.pop(field, None)
+
+    def as_dict(self) -> dict:
+        return self._extract(self, self.__data)
+
+    @classmethod
+    def _export_chunk(cls, records, astuple: bool):
+        extract = cls._extract
+        needs_view = extract.needs_view
+        for record in records:
+            out = extract(cls(record) if needs_view else None, record)
+            yield tuple(out.values()) if astuple else out
+
+    @classmethod
+    def export_many(cls, iterable, workers: int = None, chunk_size: int = 1000, astuple: bool = False,
+                    parallel_threshold: int = PARALLEL_MIN_RECORDS):
+        """
+        Export every record of iterable through this view
+
+        Inputs shorter than `parallel_threshold` records or a single worker
+        are exported in-process, larger ones are sent to a process pool chunk
+        by chunk with a bounded number of chunks in flight, output order
+        matches input order. The view class has to be importable (defined at
+        module level) to be used with a pool.
+
+        Parameters
+        ----------
+        iterable : iterable
+            raw records
+        workers : int
+            pool size, by default equal `os.cpu_count()`
+        chunk_size : int
+            records per pool task
+        astuple : bool
+            yield tuples ordered like `export_fields()` instead of dicts
+        parallel_threshold : int
+            minimal number of records sent to a pool
+
+        Yields
+        ------
+        dict or tuple
+        """
+        workers = workers or os.cpu_count() or 1
+        records = iter(iterable)
+        if workers == 1:
+            yield from cls._export_chunk(records, astuple)
+            return
+
+        # the input is buffered only until it is known to be large enough for a pool
+        head = list(islice(records, max(parallel_threshold, chunk_size)))
+        if len(head) < max(parallel_threshold, chunk_size):
+            yield from cls._export_chunk(chain(head, records), astuple)
+            return
+
+        chunks = chain(
+            (head[start:start + chunk_size] for start in range(0, len(head), chunk_size)),
+            iter(lambda: list(islice(records, chunk_size)), []),
+        )
+        window = workers * EXPORT_WINDOW_PER_WORKER
+        with mp.Pool(processes=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_export_chunk, ((cls, chunk, astuple),)))
+                if len(pending) >= window:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+
+    @classmethod
+    def _columns_extractor(cls):
+        if '_columns_extract' not in cls.__dict__:
+            dtypes = dict(
+                (name, _numeric_dtype(cls.__dict__.get(name)))
+                for name in cls._export_fields
+            )
+            raw = frozenset(name for name, dtype in dtypes.items() if dtype is not None)
+            cls._columns_extract = ExtractorBuilder().build(cls, cls._export_fields, raw), dtypes
+        return cls._columns_extract
+
+    @classmethod
+    def to_columns(cls, records, structured: bool = False):
+        """
+        Export records column-wise, one column per export field
+
+        Fields with numeric `astype` (int, float, bool or numpy scalar type) are
+        collected raw and converted per column in a single batch into numpy
+        arrays, or `array.array` without numpy; other fields become lists.
+        Conversion raises the same errors as `astype` per value would, None
+        included. Ints too large for int64 give an object array (a list
+        without numpy), structured export raises OverflowError for them.
+
+        Parameters
+        ----------
+        records : iterable
+            raw records
+        structured : bool
+            return single numpy structured array instead of dict, non-numeric fields get object dtype
+
+        Returns
+        -------
+        dict or numpy.ndarray
+        """
+        extract, dtypes = cls._columns_extractor()
+        needs_view = extract.needs_view
+        rows = [tuple(extract(cls(record) if needs_view else None, record).values()) for record in records]
+        columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in cls._export_fields]
+        del rows
+
+        if structured:
+            if np is None:
+                raise ImportError('numpy is required for structured export, install grabutils[numpy]')
+            result = np.empty(len(columns[0]) if columns else 0, dtype=[
+                (key, dtypes[name] or object)
+                for key, name in zip(cls.export_fields(), cls._export_fields)
+            ])
+            for key, name, column in zip(cls.export_fields(), cls._export_fields, columns):
+                if dtypes[name] is None:
+                    values = np.empty(len(column), dtype=object)
+                    for idx, value in enumerate(column):
+                        values[idx] = value
+                    result[key] = values
+                else:
+                    result[key] = _to_column(column, dtypes[name])
+            return result
+
+        return dict(
+            (key, _to_column(column, dtypes[name]))
+            for key, name, column in zip(cls.export_fields(), cls._export_fields, columns)
+        )
+
+    @classmethod
+    def export_fields(cls) -> tuple:
+        """
+        Output keys of `as_dict`/`export_many`
+        """
+        return tuple(
+            name.replace('attr_', '', 1) if name.startswith('attr_') else name
+            for name in cls._export_fields
+        )
+
     def __getattr__(self, item):
         if item in self._dynamic_fields:
-            return getattr(self, 'attr_' + item)(self.__data)
+            if item in self._cached_fields:
+                return self._memoize(item, getattr(self, 'attr_' + item))
+            return getattr(self, 'attr_' + item)(self._get_data())
         return super(ObjectView, self).__getattribute__(item)
 
     class Meta:
         fields = []
         ignore_fields = []
+        compiled = True
+        cache = False
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+INDEX_CACHE_SIZE = 1024
+
+_MAX_AGE = re.compile(r'max-age\s*=\s*"?(\d+)"?', re.I)
+
+
+def cache_control(headers) -> tuple:
+    """
+    (storable, max_age) from Cache-Control header of response
+    """
+    value = headers.get('Cache-Control', '').lower()
+    if 'no-store' in value:
+        return False, 0
+    if 'no-cache' in value:
+        return True, 0
+    match = _MAX_AGE.search(value)
+    return True, int(match.group(1)) if match else 0
+
+
+class HttpCache:
+    """
+    Conditional-request cache of GET responses
+
+    Bodies are stored on disk by their sha256, so equal bodies are stored
+    once, metadata of every url is stored next to them and the most recently
+    used entries are kept in memory. Entries younger than Cache-Control
+    max-age are served without a request, older ones are revalidated with
+    If-None-Match / If-Modified-Since and a 304 answer serves the stored body.
+
+    Entries are keyed by url with query params. Request headers named by
+    the response `Vary` header are stored with the entry and a request with
+    other values is sent unconditionally, `Vary: *` responses are not
+    stored. Auth is not part of the key: use one cache per identity.
+
+    Parameters
+    ----------
+    directory: str | Path
+        cache location, shared between runs
+    index_size: int
+        metadata entries kept in memory
+    """
+
+    def __init__(self, directory, index_size: int = INDEX_CACHE_SIZE):
+        self.directory = Path(directory)
+        self.index_size = index_size
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(value: bytes) -> str:
+        return hashlib.sha256(value).hexdigest()
+
+    def _path(self, kind: str, digest: str) -> Path:
+        return self.directory / kind / digest[:2] / digest
+
+    def _write(self, path: Path, content: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+
+    def _load(self, key: str):
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                self._index.move_to_end(key)
+                return entry
+        path = self._path('index', self._digest(key.encode()))
+        if not path.exists():
+            return None
+        entry = json.loads(path.read_text())
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._index[key] = entry
+            self._index.move_to_end(key)
+            while len(self._index) > self.index_size:
+                self._index.popitem(last=False)
+
+    @staticmethod
+    def _vary(headers, request_headers) -> dict:
+        names = [name.strip() for name in headers.get('Vary', '').split(',') if name.strip()]
+        return dict((name.lower(), request_headers.get(name)) for name in names)
+
+    def _store(self, key: str, response: requests.Response, request_headers, entry: dict = None):
+        if entry is None:
+            storable, max_age = cache_control(response.headers)
+            validated = 'ETag' in response.headers or 'Last-Modified' in response.headers
+            if (not storable or response.status_code != 200 or not (validated or max_age) or
+                    response.headers.get('Vary', '').strip() == '*'):
+                return
+            body = self._digest(response.content)
+            self._write(self._path('bodies', body), response.content)
+            entry = dict(
+                url=response.url,
+                body=body,
+                headers=dict(response.headers),
+                encoding=response.encoding,
+                vary=self._vary(response.headers, request_headers),
+            )
+        else:
+            # 304 refreshes validators and freshness of stored response, missing headers are kept
+            headers = CaseInsensitiveDict(entry['headers'])
+            headers.update(response.headers)
+            headers.pop('Content-Length', None)
+            entry = dict(entry, headers=dict(headers))
+            storable, max_age = cache_control(headers)
+            if not storable:
+                return
+        entry.update(stored_at=time.time(), max_age=max_age)
+        self._write(self._path('index', self._digest(key.encode())), json.dumps(entry).encode())
+        self._remember(key, entry)
+
+    def _response(self, entry: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response._content = self._path('bodies', entry['body']).read_bytes()
+        response.from_cache = True
+        return response
+
+    def get(self, client, url: str, **kwargs) -> requests.Response:
+        """
+        GET url through the cache
+
+        Parameters
+        ----------
+        client: requests.Session | module
+            sends the request on miss or revalidation
+        url: str
+            requested url, query params are taken from `params` keyword
+        """
+        key = requests.Request('GET', url, params=kwargs.get('params')).prepare().url
+        request_headers = CaseInsensitiveDict(getattr(client, 'headers', None) or {})
+        request_headers.update(kwargs.get('headers') or {})
+        entry = self._load(key)
+        if entry is not None and not os.path.exists(self._path('bodies', entry['body'])):
+            entry = None
+        if entry is not None and self._vary(entry['headers'], request_headers) != entry.get('vary', {}):
+            entry = None
+
+        if entry is not None and time.time() - entry['stored_at'] < entry['max_age']:
+            with self._lock:
+                self.hits += 1
+            return self._response(entry)
+
+        if entry is not None:
+            headers = dict(kwargs.get('headers') or {})
+            validators = CaseInsensitiveDict(entry['headers'])
+            if 'ETag' in validators:
+                headers['If-None-Match'] = validators['ETag']
+            if 'Last-Modified' in validators:
+                headers['If-Modified-Since'] = validators['Last-Modified']
+            kwargs['headers'] = headers
+
+        response = client.get(url, **kwargs)
+        if entry is not None and response.status_code == 304:
+            with self._lock:
+                self.revalidated += 1
+            self._store(key, response, request_headers, entry)
+            return self._response(self._load(key))
+
+        with self._lock:
+            self.misses += 1
+        self._store(key, response, request_headers)
+        return response
+
+    def stats(self) -> dict:
+        return dict(hits=self.hits, misses=self.misses, revalidated=self.revalidated)
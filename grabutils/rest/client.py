@@ -1,9 +1,21 @@
+import asyncio
+import functools as fn
 import logging
-from abc import ABC
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from urllib.parse import urljoin, urlencode, quote_plus
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from ..dictutils import compile_path
+from .cache import HttpCache
+
+POOL_CONNECTIONS = 10
+POOL_SIZE = 10
+CONCURRENCY = 10
 
 
 class Field:
@@ -61,11 +73,197 @@ class Dto(ABC):
                 setattr(self, f, data[f])
 
 
+class Pagination(ABC):
+    """
+    Paging strategy: request of the first page and request following a fetched page
+
+    A request is a (url, params) pair, `predictable` strategies compute the
+    following request without the page so several of them can be fetched
+    ahead.
+
+    Parameters
+    ----------
+    items: str
+        dotted path of items in decoded JSON, None if the page is the list itself
+    """
+    predictable = False
+
+    def __init__(self, items: str = 'items'):
+        self.items_path = compile_path(items) if items else None
+
+    def items(self, payload) -> list:
+        items = self.items_path(payload) if self.items_path else payload
+        return items or []
+
+    def first(self, url: str, params: dict) -> tuple:
+        return url, params
+
+    def predict(self, request: tuple):
+        """
+        Request following `request` known before it is fetched, None if it depends on the response
+        """
+        return None
+
+    @abstractmethod
+    def next(self, request: tuple, response: requests.Response, payload, items: list):
+        """
+        Request of the page following fetched one, None on the last page
+        """
+
+
+class PageNumber(Pagination):
+    """
+    ?page=1, ?page=2, ... until an empty page or a page shorter than `size`
+    """
+    predictable = True
+
+    def __init__(self, items: str = 'items', param: str = 'page', start: int = 1,
+                 size: int = None, size_param: str = 'per_page'):
+        super().__init__(items)
+        self.param = param
+        self.start = start
+        self.size = size
+        self.size_param = size_param
+
+    def first(self, url: str, params: dict) -> tuple:
+        params = dict(params, **{self.param: self.start})
+        if self.size:
+            params[self.size_param] = self.size
+        return url, params
+
+    def predict(self, request: tuple) -> tuple:
+        url, params = request
+        return url, dict(params, **{self.param: params[self.param] + 1})
+
+    def next(self, request, response, payload, items):
+        if not items or self.size and len(items) < self.size:
+            return None
+        return self.predict(request)
+
+
+class Offset(PageNumber):
+    """
+    ?offset=0&limit=N, ?offset=N&limit=N, ... until a page shorter than `limit`
+    """
+
+    def __init__(self, items: str = 'items', param: str = 'offset', limit: int = 100, limit_param: str = 'limit'):
+        super().__init__(items, param=param, start=0, size=limit, size_param=limit_param)
+
+    def predict(self, request: tuple) -> tuple:
+        url, params = request
+        return url, dict(params, **{self.param: params[self.param] + self.size})
+
+
+class Cursor(Pagination):
+    """
+    Cursor taken from `cursor` path of a page is sent as `param` of the following request
+    """
+
+    def __init__(self, items: str = 'items', cursor: str = 'next_cursor', param: str = 'cursor'):
+        super().__init__(items)
+        self.cursor = compile_path(cursor)
+        self.param = param
+
+    def next(self, request, response, payload, items):
+        cursor = self.cursor(payload)
+        if not cursor or not items:
+            return None
+        url, params = request
+        return url, dict(params, **{self.param: cursor})
+
+
+class NextLink(Pagination):
+    """
+    Absolute or relative url of the following page from `link` path of a page or from `Link: rel="next"` header
+    """
+
+    def __init__(self, items: str = 'items', link: str = None):
+        super().__init__(items)
+        self.link = compile_path(link) if link else None
+
+    def next(self, request, response, payload, items):
+        link = self.link(payload) if self.link else response.links.get('next', {}).get('url')
+        if not link:
+            return None
+        return urljoin(response.url, link), {}
+
+
+class Session(requests.Session):
+    """
+    Pooled HTTP session shared by an Endpoint tree
+
+    Connections are kept alive and reused from a per host pool, the pool
+    blocks instead of opening extra connections when all of them are busy, so
+    one session can serve a whole worker pool. Configure it once, before it is
+    shared between threads.
+
+    Parameters
+    ----------
+    pool_size: int
+        connections kept per host
+    pool_connections: int
+        number of hosts with cached pools
+    keep_alive: bool
+        reuse connections, False sends `Connection: close`
+    headers: dict
+        default headers of every request
+    auth: tuple | requests.auth.AuthBase
+        default auth of every request
+    timeout: float | tuple
+        default timeout of every request
+    max_retries: int
+        retries of failed connects
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, pool_connections: int = POOL_CONNECTIONS, keep_alive: bool = True,
+                 headers: dict = None, auth=None, timeout=None, max_retries: int = 0):
+        super().__init__()
+        self.pool_size = pool_size
+        self.timeout = timeout
+        if headers:
+            self.headers.update(headers)
+        if not keep_alive:
+            self.headers['Connection'] = 'close'
+        self.auth = auth
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_size,
+            max_retries=max_retries,
+            pool_block=True,
+        )
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
 class Endpoint:
     logger = logging.getLogger(__name__)
 
-    def __init__(self, base, **params):
+    def __init__(self, base, *, session: requests.Session = None, cache: HttpCache = None, **params):
+        """
+        Parameters
+        ----------
+        base: str
+            endpoint url
+        session: requests.Session
+            session shared with child endpoints, e.g. pooled `Session`,
+            module level `requests` functions are used without it
+        cache: HttpCache
+            conditional-request cache of GET responses shared with child endpoints
+        params: dict
+            query parameters of every request
+
+        Attributes and methods of endpoint (`base`, `params`, `paginate`) are
+        not turned into child endpoints, use call syntax for such paths:
+        `api('params')`.
+        """
         self.base = base
+        self._session = session
+        self._cache = cache
         self.params = params
 
     def __repr__(self):
@@ -76,17 +274,196 @@ class Endpoint:
     def __call__(self, *context, **params):
         paramz = dict(self.params)
         paramz.update(**params)
-        return Endpoint(urljoin(self.base + '/', '/'.join(map(quote_plus, map(str, context))), **paramz))
+        url = urljoin(self.base + '/', '/'.join(map(quote_plus, map(str, context))))
+        return self._child(url, paramz)
+
+    def _child(self, url: str, params: dict) -> 'Endpoint':
+        return type(self)(url, session=self._session, cache=self._cache, **params)
 
     def __getattr__(self, key: str):
         if key in {'get', 'post', 'put', 'delete'}:
             logger = self.logger
             url = self.base
+            client = self._session or requests
+            cache = self._cache if key == 'get' else None
+            endpoint_params = self.params
 
             def wrap(*args, **kwargs):
                 logger.debug(f"{key.upper()} {url}")
-                method = getattr(requests, key)
+                if key == 'get' and args:
+                    kwargs['params'], args = args[0], args[1:]
+                if endpoint_params:
+                    params = kwargs.get('params')
+                    kwargs['params'] = dict(endpoint_params)
+                    kwargs['params'].update(params or {})
+                if cache is not None:
+                    return cache.get(client, url, **kwargs)
+                method = getattr(client, key)
                 return method(url, *args, **kwargs)
 
             return wrap
-        return Endpoint(urljoin(self.base + '/', key), **self.params)
+        if key.startswith('__'):
+            raise AttributeError(key)
+        return self._child(urljoin(self.base + '/', key), self.params)
+
+    def _fetch(self, request: tuple, kwargs: dict) -> tuple:
+        url, params = request
+        endpoint = self if url == self.base else Endpoint(url, session=self._session, cache=self._cache)
+        # plain blocking get, also for AsyncEndpoint
+        response = Endpoint.__getattr__(endpoint, 'get')(params=params, **kwargs)
+        response.raise_for_status()
+        return response, response.json()
+
+    def paginate(self, strategy: Pagination, prefetch: int = 1, **kwargs):
+        """
+        Iterate items of every page, fetching following pages in background
+
+        Parameters
+        ----------
+        strategy: Pagination
+            `PageNumber`, `Offset`, `Cursor`, `NextLink` or custom one
+        prefetch: int
+            pages requested ahead while items of the current one are consumed,
+            predictable strategies may request up to `prefetch` pages past the last one,
+            0 fetches pages only when they are needed
+        kwargs: dict
+            `params` of the first page and other keyword arguments of `get`
+
+        Returns
+        -------
+        generator
+            items in page order
+        """
+        request = strategy.first(self.base, dict(kwargs.pop('params', None) or {}))
+        if not prefetch:
+            while request:
+                response, payload = self._fetch(request, kwargs)
+                items = strategy.items(payload)
+                yield from items
+                request = strategy.next(request, response, payload, items)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=prefetch)
+        pending = deque()
+        ahead = request
+
+        def submit(req):
+            pending.append((req, pool.submit(self._fetch, req, kwargs)))
+
+        try:
+            submit(request)
+            while pending:
+                if strategy.predictable:
+                    while ahead is not None and len(pending) < prefetch + 1:
+                        ahead = strategy.predict(ahead)
+                        submit(ahead)
+
+                request, future = pending.popleft()
+                response, payload = future.result()
+                items = strategy.items(payload)
+                following = strategy.next(request, response, payload, items)
+                if following is None:
+                    ahead = None
+                    for _, future in pending:
+                        future.cancel()
+                    pending.clear()
+                elif not strategy.predictable:
+                    submit(following)
+                yield from items
+        finally:
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+
+class AsyncEndpoint(Endpoint):
+    """
+    Endpoint with awaitable get/post/put/delete
+
+    Blocking requests run in `executor`, without it a thread pool of
+    `session.pool_size` (`CONCURRENCY` for other sessions) threads is created,
+    with a pooled `Session` every worker thread reuses the same connections.
+    At most executor size requests run at once whatever concurrency they are
+    awaited with. Child endpoints share session and executor, the created
+    pool is shut down by `close()` of the root endpoint or `async with`.
+    """
+
+    def __init__(self, base, *, session: requests.Session = None, cache: HttpCache = None, executor=None, **params):
+        super().__init__(base, session=session, cache=cache, **params)
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=getattr(session, 'pool_size', CONCURRENCY))
+        self._executor = executor
+
+    async def __aenter__(self) -> 'AsyncEndpoint':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shut down the thread pool created by this endpoint, an executor passed in is left to its owner
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    def _child(self, url: str, params: dict) -> 'AsyncEndpoint':
+        return type(self)(url, session=self._session, cache=self._cache, executor=self._executor, **params)
+
+    def __getattr__(self, key: str):
+        if key not in {'get', 'post', 'put', 'delete'}:
+            return super().__getattr__(key)
+
+        request = super().__getattr__(key)
+        executor = self._executor
+
+        async def wrap(*args, **kwargs) -> requests.Response:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, fn.partial(request, *args, **kwargs))
+
+        return wrap
+
+
+async def gather_limited(requests, concurrency: int = CONCURRENCY, return_exceptions: bool = False) -> list:
+    """
+    Await requests with at most `concurrency` of them in flight
+
+    Parameters
+    ----------
+    requests: iterable
+        awaitables or callables returning awaitables, consumed lazily so
+        callables are invoked only when a slot is free
+    concurrency: int
+        maximum number of requests awaited at once, requests running in a
+        thread pool (`AsyncEndpoint`) are also limited by its size
+    return_exceptions: bool
+        put exceptions into results instead of raising the first one
+
+    Returns
+    -------
+    list
+        results in the order of requests
+    """
+    if concurrency <= 0:
+        raise ValueError(f'concurrency must be positive, got {concurrency}')
+
+    results = {}
+    pending = iter(enumerate(requests))
+
+    async def worker():
+        for idx, request in pending:
+            try:
+                results[idx] = await (request() if callable(request) else request)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[idx] = e
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    return [results[idx] for idx in range(len(results))]
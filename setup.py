@@ -5,7 +5,9 @@ with open("readme.md", "r") as fh:
 
 bs_deps = [
     'beautifulsoup4',
-    'lxml'
+    'soupsieve',
+    'lxml',
+    'cssselect'
 ]
 
 ssh_deps = [
@@ -20,6 +22,10 @@ img_deps = [
     'Pillow'
 ]
 
+numpy_deps = [
+    'numpy'
+]
+
 setuptools.setup(
     name="grabutils",
     version="0.0.28",
@@ -35,7 +41,8 @@ setuptools.setup(
         'ssh': ssh_deps,
         'rest': rest_deps,
         'img': img_deps,
-        'all': bs_deps + ssh_deps + rest_deps + img_deps
+        'numpy': numpy_deps,
+        'all': bs_deps + ssh_deps + rest_deps + img_deps + numpy_deps
     },
     tests_require=[
         'pytest'
@@ -1,3 +1,8 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
 import pytest
 
 
@@ -6,3 +11,65 @@ def html():
     with open('tests/index.html') as html:
         html_content = html.read()
     return html_content
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in API: echoes request as JSON, `server.routes` may override paths
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status: int = 200, body=b'', headers: dict = None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_any(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        request = dict(
+            method=self.command,
+            path=url.path,
+            query=dict(parse_qsl(url.query)),
+            headers=dict(self.headers.items()),
+            body=self.rfile.read(length).decode() if length else None,
+        )
+        with self.server.lock:
+            self.server.requests.append(request)
+
+        route = self.server.routes.get(url.path)
+        if route:
+            self.reply(*route(request))
+        else:
+            self.reply(200, request, {'Content-Type': 'application/json'})
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_any
+
+
+@pytest.fixture
+def api_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = []
+    server.routes = {}
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
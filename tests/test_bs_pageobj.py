@@ -1,7 +1,11 @@
 import operator as op
+import os
 
 import pytest
+from bs4 import BeautifulSoup, Tag
+from lxml import etree
 
+from grabutils.bs import pageobj
 from grabutils.bs.pageobj import (
     BsField, BsPageObj, PageObject, Href, Image, Nested,
     inner_text, stripped, as_attr, List
@@ -86,6 +90,11 @@ def test_page_object(html):
     }
 
 
+def test_page_object_classmethods_are_not_fields():
+    assert pageobj.PageObject._export_fields == ()
+    assert pageobj.PageObject('<p>x</p>').as_dict() == {}
+
+
 def test_link(page):
     link = page.link
 
@@ -147,3 +156,420 @@ def test_nested(page: PageObject):
 
     assert '_invisible' not in page.as_dict()
     assert 'custom_field' in page.as_dict()
+
+
+def test_compiled_selectors(html):
+    field = PageObjectConstant.__dict__['hrefs']
+    assert field.matcher is not None
+    assert field(PageObjectConstant(html).as_source()) == PageObjectConstant(html).as_dict()['hrefs']
+
+    lazy = BsField('ul > li', inner_text, many=True)
+    assert lazy.matcher is None
+    assert lazy(PageObjectConstant(html).as_source()) == ['Alpha', 'Beta', 'Gamma']
+    assert lazy.matcher is not None
+
+
+class LxmlLanguage(pageobj.PageObject):
+    href = BsField(None, as_attr('href'))
+    label = BsField(None, inner_text)
+
+    class Meta:
+        backend = 'lxml'
+
+
+class LxmlPage(pageobj.PageObject):
+    paragraph = BsField('p', inner_text, stripped)
+    link = Href('.test-url')
+    image = Image('.test-img')
+    items = BsField('ul > li', inner_text, stripped, many=True)
+    classes = BsField('ul > li', as_attr('class'), many=True)
+    languages_2 = BsField('.languages a', Nested(LxmlLanguage), many=True)
+    languages_3 = BsField('.languages > div', List(BsField('a', inner_text, many=True)), many=True)
+    missing = BsField('.missing', inner_text)
+
+    class Meta:
+        backend = 'lxml'
+
+
+def test_lxml_backend(html, page):
+    value = LxmlPage(html).as_dict()
+
+    assert value['paragraph'] == page.paragraph
+    assert value['link'] == page.link
+    assert value['image'] == page.image
+    assert value['items'] == page.items
+    assert value['classes'] == [['alpha'], ['beta'], ['gamma']]
+    assert value['languages_2'] == page.languages_2
+    assert value['languages_3'] == [['Ada', 'Java'], ['C++'], ['Cobol'], ['D', 'Go']]
+    assert value['missing'] is None
+
+
+class RootedPage(pageobj.PageObject):
+    title = BsField('html > head > title', inner_text)
+    roots = BsField('html', many=True)
+
+    class Meta:
+        cache_trees = False
+
+
+class LxmlRootedPage(RootedPage):
+    title = BsField('html > head > title', inner_text)
+    roots = BsField('html', many=True)
+
+    class Meta:
+        backend = 'lxml'
+        cache_trees = False
+
+
+@pytest.mark.filterwarnings('ignore::bs4.XMLParsedAsHTMLWarning')
+@pytest.mark.parametrize('klass', [RootedPage, LxmlRootedPage])
+def test_backend_document_root(html, klass):
+    assert klass(html).title == 'Test page'
+    assert len(klass(html).roots) == 1
+    declared = '<?xml version="1.0" encoding="utf-8"?>\n' + html
+    assert klass(declared).title == 'Test page'
+    assert klass(declared.encode()).title == 'Test page'
+    assert klass('').title is None
+
+
+class StrainedPage(pageobj.PageObject):
+    title = BsField('head > title', inner_text)
+    items = BsField('ul > li', inner_text, many=True)
+    languages = BsField('.languages a', Nested(Language2), many=True)
+    first = BsField('ul li.beta', inner_text)
+
+    class Meta:
+        parse_only = True
+
+
+class SiblingPage(pageobj.PageObject):
+    image = BsField('a + img', as_attr('alt'))
+
+    class Meta:
+        parse_only = True
+
+
+class NavigatingPage(pageobj.PageObject):
+    parent = BsField('.test-url', lambda tag: tag.parent.name)
+    next_item = BsField('li.alpha', lambda tag: tag.find_next_sibling('li').string)
+
+
+class ExplicitStrainPage(pageobj.PageObject):
+    items = BsField('li', inner_text, many=True)
+
+    class Meta:
+        parse_only = 'ul'
+
+
+def test_parse_only(html, page):
+    assert isinstance(StrainedPage._parse_only, pageobj.SelectorStrainer)
+    assert PageObjectConstant._parse_only is None
+    assert SiblingPage._parse_only is None
+
+    pageobj.tree_cache.clear()
+    value = StrainedPage(html).as_dict()
+    assert value == {
+        'title': 'Test page',
+        'items': page.items,
+        'languages': page.languages_2,
+        'first': 'Beta',
+    }
+    assert StrainedPage(html).as_source().find('p') is None
+    assert SiblingPage(html).image == 'Python logo'
+    assert ExplicitStrainPage(html).items == ['Alpha', 'Beta', 'Gamma']
+
+    # strainers are opt-in, then chains may walk out of the selected subtree
+    assert NavigatingPage._parse_only is None
+    assert NavigatingPage(html).as_dict() == {'parent': 'div', 'next_item': 'Beta'}
+
+
+def test_tree_cache(html):
+    cache = pageobj.tree_cache
+    cache.clear()
+
+    strained = StrainedPage(html)
+    assert StrainedPage(html).as_source() is strained.as_source()
+    # classes share a tree only when they parse the same way
+    full = PlannedPage(html).as_source()
+    assert full is not strained.as_source() and full.find('p') is not None
+    assert strained.as_source().find('p') is None
+    assert UnplannedPage(html).as_source() is full
+    assert BsPageObj(html).page() is full
+    assert ExplicitStrainPage(html).as_source() not in (full, strained.as_source())
+    assert LxmlPage(html).as_source() is LxmlPage(html).as_source()
+    assert (cache.hits, cache.misses) == (4, 4)
+
+    # output does not depend on what parsed the same page before
+    navigating = type('StrainedNavigatingPage', (pageobj.PageObject,), {
+        'parent': BsField('.test-url', lambda tag: tag.parent.name),
+        'Meta': type('Meta', (), {'parse_only': True}),
+    })
+    cache.clear()
+    before = navigating(html).as_dict()
+    UnplannedPage(html).as_dict()
+    assert navigating(html).as_dict() == before
+
+    cache.clear()
+    assert pageobj.PageObject(BeautifulSoup(html, 'lxml')).as_source() is not None
+    assert len(cache) == 0
+    small = pageobj.TreeCache(max_bytes=len(html) * pageobj.TREE_SIZE_FACTOR['bs4'])
+    first = small.parse(html)
+    assert small.parse(html) is first
+    small.parse(html[:-1])
+    assert len(small) == 1 and small.parse(html) is not first
+
+    # distinct pages do not pile up, pages parsed once are not cached at all
+    cache.clear()
+    pages = [html.replace('Test page', f'Test page {idx}') for idx in range(3 * pageobj.TREE_CACHE_ENTRIES)]
+    assert len(set(pages)) == len(pages)
+    for page in pages:
+        PlannedPage(page).as_dict()
+    assert len(cache) == pageobj.TREE_CACHE_ENTRIES and cache.misses == len(pages)
+    cache.clear()
+    assert len(list(PlannedPage.parse_many(pages, workers=1))) == len(pages)
+    with cache.bypass():
+        PlannedPage(html).as_dict()
+    assert len(cache) == 0 and cache.misses == 0
+
+
+class DetachedPage(pageobj.PageObject):
+    items = BsField('ul > li', many=True)
+    first = BsField('ul > li', inner_text)
+    languages = BsField('.languages > div', Nested(Language1), many=True)
+
+    @property
+    def raw_items(self):
+        return self.as_source().select('li')
+
+    class Meta:
+        detached = True
+
+
+class LxmlDetachedPage(pageobj.PageObject):
+    items = BsField('ul > li', many=True)
+    first = BsField('ul > li', inner_text)
+
+    class Meta:
+        backend = 'lxml'
+        detached = True
+
+
+class FieldDetachedPage(BsPageObj):
+    items = BsField('ul > li', many=True, detached=True)
+    live = BsField('ul > li', many=True)
+
+
+def test_detached(html, page):
+    alpha = pageobj.DetachedNode('li', 'Alpha', {'class': ('alpha',)})
+    detached = DetachedPage(html)
+    value = detached.as_dict()
+    assert value['items'][0] == alpha and len(value['items']) == 3
+    assert value['raw_items'] == value['items']
+    assert type(value['first']) is str and value['first'] == 'Alpha'
+    assert [type(label) for language in value['languages'] for label in language['label']] == [str] * 6
+    assert detached.as_source() is None
+    assert detached.as_dict() is value
+
+    lxml_page = LxmlDetachedPage(html)
+    assert lxml_page.as_dict() == {'items': value['items'], 'first': 'Alpha'}
+    assert type(lxml_page.as_dict()['first']) is str and lxml_page.as_source() is None
+
+    # trees passed in are owned by the caller and survive
+    soup = BeautifulSoup(html, 'lxml')
+    assert DetachedPage(soup).as_dict() == value
+    assert soup.find('li') is not None
+
+    mixed = FieldDetachedPage(html)
+    assert mixed.items[0] == alpha
+    assert isinstance(mixed.live[0], Tag)
+    assert mixed.as_dict()['live'][0].name == 'li' and mixed.page() is not None
+
+
+class LanguageRow(pageobj.PageObject):
+    labels = BsField('a', inner_text, many=True)
+    first = BsField('a', as_attr('href'))
+
+    class Meta:
+        row = '.languages > div'
+
+
+class WrappedRow(pageobj.PageObject):
+    label = BsField('a', inner_text)
+    tree_size = BsField(None, lambda row: sum(1 for _ in row.getroottree().iter()))
+
+    class Meta:
+        row = '.listing .row'
+
+
+def test_iter_rows(html, page):
+    rows = list(LanguageRow.iter_rows(html, chunk_size=50))
+    assert [row['labels'] for row in rows] == [['Ada', 'Java'], ['C++'], ['Cobol'], ['D', 'Go']]
+    assert rows[0]['first'] == 'http://ada'
+    assert list(LanguageRow.iter_rows(html.encode())) == rows
+    assert list(LanguageRow.iter_rows(iter(html.splitlines(keepends=True)))) == rows
+    assert LanguageRow._backend == 'lxml'
+
+    # wrapped rows: the partial tree stays as small as one row, whatever the row count
+    wrapped = '<html><body><div class="listing">' + ''.join(
+        f'<div class="wrap"><div class="row"><a href="/{idx}">L{idx}</a></div></div>' for idx in range(500)
+    ) + '</div></body></html>'
+    rows = list(WrappedRow.iter_rows(wrapped, chunk_size=256))
+    assert [row['label'] for row in rows] == [f'L{idx}' for idx in range(500)]
+    # rows parsed ahead within the current chunk stay in the tree until reached
+    assert max(row['tree_size'] for row in rows) <= 40
+
+    with pytest.raises(Exception):
+        type('BsRow', (pageobj.PageObject,), {'Meta': type('Meta', (), {'row': 'div', 'backend': 'bs4'})})
+    with pytest.raises(Exception):
+        next(PlannedPage.iter_rows(html))
+
+
+def test_as_dict_single_evaluation(html, page):
+    calls = []
+
+    def counted(value):
+        calls.append(value)
+        return value.string
+
+    class Counted(BsPageObj):
+        items = BsField('ul > li', counted, many=True)
+        label = BsField('p', counted)
+
+    assert Counted.field_table() == ('items', 'label')
+    assert 'custom_field' in PageObject.field_table()
+
+    counted_page = Counted(html)
+    assert counted_page.as_dict() == {'items': ['Alpha', 'Beta', 'Gamma'], 'label': 'Hello, world!'}
+    assert counted_page.as_dict() is counted_page.as_dict()
+    assert len(calls) == 4
+
+
+def crash_on_marker(value):
+    if value.string == 'CRASH':
+        os._exit(1)
+    if value.string == 'FAIL':
+        raise ValueError(value.string)
+    return value.string
+
+
+class TitlePage(pageobj.PageObject):
+    title = BsField('title', crash_on_marker)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parse_many(workers, tmp_path):
+    titles = ['a', 'FAIL', 'b', 'c', 'd']
+    if workers > 1:
+        titles[3] = 'CRASH'
+    pages = ['<html><head><title>%s</title></head></html>' % title for title in titles]
+    path = tmp_path / 'page.html'
+    path.write_text(pages[0])
+
+    results = list(TitlePage.parse_many(pages + [path], workers=workers, window=3))
+    expected = [{'title': title} for title in titles + ['a'] if title not in ('FAIL', 'CRASH')]
+    assert results == expected
+
+    results = list(TitlePage.parse_many(pages, workers=workers, errors='return'))
+    assert isinstance(results[1], pageobj.PageParseError) and results[1].index == 1
+    assert len(results) == len(pages)
+
+    with pytest.raises(pageobj.PageParseError):
+        list(TitlePage.parse_many(pages, workers=workers, errors='raise'))
+
+    assert sorted(map(str, TitlePage.parse_many(pages, workers=workers, ordered=False, errors='return'))) == sorted(
+        map(str, results)
+    )
+
+
+class NodePage(pageobj.PageObject):
+    cards = BsField('.card', many=True)
+    # bs4 tags are callable and would be called by as_dict
+    first = BsField('.card', lambda node: [node])
+
+
+class LxmlNodePage(pageobj.PageObject):
+    cards = BsField('.card', many=True)
+    first = BsField('.card', lambda node: [node])
+
+    class Meta:
+        backend = 'lxml'
+
+
+def walk_values(value):
+    yield value
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            yield from walk_values(item)
+
+
+@pytest.mark.parametrize('klass', [NodePage, LxmlNodePage])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parse_many_detaches_nodes(klass, workers):
+    pages = ['<div class="card" id="%d">card %d</div>' % (idx, idx) * 3 for idx in range(4)]
+    results = list(klass.parse_many(pages, workers=workers))
+
+    assert [len(result['cards']) for result in results] == [3] * 4
+    assert results[1]['first'] == [pageobj.DetachedNode('div', 'card 1', {'class': ('card',), 'id': '1'})]
+    assert not any(isinstance(value, (Tag, etree._Element)) for value in walk_values(results))
+
+
+class PlannedPage(pageobj.PageObject):
+    languages = BsField('.languages div a', inner_text, many=True)
+    first = BsField('.languages div a', as_attr('href'))
+    second = BsField('.languages div + div a', inner_text)
+    blocks = BsField('.languages > div', many=True)
+    missing = BsField('.languages .missing', inner_text)
+    items = BsField('ul li', inner_text, many=True)
+
+
+class PageWidePage(pageobj.PageObject):
+    languages = BsField('.languages div a', inner_text, many=True)
+    first = BsField('.languages div a', as_attr('href'))
+    second = BsField('.languages div + div a', inner_text)
+    blocks = BsField('.languages > div', many=True)
+    missing = BsField('.languages .missing', inner_text)
+    items = BsField('ul li', inner_text, many=True)
+
+    class Meta:
+        plan_scope_limit = 0
+
+
+class LxmlPlannedPage(pageobj.PageObject):
+    languages = BsField('.languages div a', inner_text, many=True)
+    second = BsField('.languages div + div a', inner_text)
+
+    class Meta:
+        backend = 'lxml'
+
+
+class UnplannedPage(pageobj.PageObject):
+    languages = BsField('.languages div a', inner_text, many=True)
+    first = BsField('.languages div a', as_attr('href'))
+    second = BsField('.languages div + div a', inner_text)
+
+    class Meta:
+        plan = False
+
+
+def test_query_plan(html, page):
+    assert pageobj.plan_fields(dict((k, v) for k, v in vars(PlannedPage).items() if isinstance(v, BsField))) == {
+        '.languages': {'languages': 'div a', 'first': 'div a', 'second': 'div + div a', 'missing': '.missing'},
+    }
+
+    value = PlannedPage(html).as_dict()
+    assert value['languages'] == page.languages
+    assert value['first'] == 'http://ada'
+    assert value['second'] == 'C++'
+    assert value['missing'] is None
+    assert len(value['blocks']) == 4
+    assert value['items'] == ['Alpha', 'Beta', 'Gamma']
+    assert UnplannedPage(html).as_dict() == dict((k, value[k]) for k in ('languages', 'first', 'second'))
+    assert LxmlPlannedPage(html).as_dict() == dict((k, value[k]) for k in ('languages', 'second'))
+    assert PageWidePage(html).as_dict() == value
+
+    plan = PlannedPage.explain()
+    assert "scope '.languages'" in plan
+    assert "    second: ':scope div + div a'" in plan
+    assert "    blocks: '.languages > div'" in plan
@@ -1,3 +1,5 @@
+import io
+import json
 import re
 
 import pytest
@@ -69,3 +71,142 @@ def test_regex(data):
         [{'c': 'c'}, 'd', 4, ('e', 5)],
         None
     ]
+
+
+def test_compile(data):
+    path = dictview.compile('b.3.1')
+    assert path.keys == ('b', 3, 1)
+    assert dictview.compile('b.3.1') is path
+    assert path(data.value) == 5
+    assert dictview.compile('a.b.c.d')(data.value) is None
+    assert dictview.compile('e.f')(data.value) is None
+
+
+def test_project(data):
+    assert data.project(x='a.b', y='b.0.c', z='b.100') == {'x': 1, 'y': 'c', 'z': None}
+
+
+def test_project_many():
+    records = [
+        {'data': {'item': {'id': 1, 'name': 'a'}}},
+        {'data': {'item': {'id': 2}}},
+        {'data': None},
+    ]
+    assert list(dictview.project_many(records, id='data.item.id', name='data.item.name')) == [
+        {'id': 1, 'name': 'a'},
+        {'id': 2, 'name': None},
+        {'id': None, 'name': None},
+    ]
+
+
+def test_stream():
+    records = [
+        {'id': 1, 'offer': {'price': 1.5, 'tags': ['a', 'b']}, 'skip': {'x': '}]"\\'}},
+        {'id': 2, 'offer': None},
+    ]
+    paths = {'id': 'id', 'price': 'offer.price', 'tag': 'offer.tags.1'}
+    expected = [
+        {'id': 1, 'price': 1.5, 'tag': 'b'},
+        {'id': 2, 'price': None, 'tag': None},
+    ]
+
+    doc = json.dumps({'meta': {'total': 2}, 'data': {'items': records}})
+    assert list(dictview.stream(io.StringIO(doc), paths, prefix='data.items', chunk_size=3)) == expected
+    assert list(dictview.stream(io.StringIO(doc), ['meta.total'])) == [{'meta.total': 2}]
+
+    lines = '\n'.join(json.dumps(record) for record in records).encode()
+    assert list(dictview.stream(io.BytesIO(lines), paths, lines=True, chunk_size=5)) == expected
+
+    # chunks ending inside a multibyte char decode to ''
+    doc = '{"a": "€€€€", "b": 1}'.encode()
+    for chunk_size in (1, 2, 3):
+        assert list(dictview.stream(io.BytesIO(doc), ['a', 'b'], chunk_size=chunk_size)) == [{'a': '€€€€', 'b': 1}]
+
+
+def test_scan_fanout():
+    view = dictview({
+        'results': [
+            {'offers': [{'price': 1}, {'price': 2}, {}]},
+            {'offers': None},
+            {'offers': [{'price': 3}]},
+        ],
+        'map': {'x': {'v': 1}, 'y': {'v': 2}},
+    })
+
+    assert list(view.iscan('results.*.offers.*.price')) == [1, 2, None, 3]
+    assert list(view.iscan('results.0.offers.1:.price')) == [2, None]
+    assert list(view.iscan('results.::2.offers.0.price')) == [1, 3]
+    assert list(view.iscan('map.*.v')) == [1, 2]
+    assert list(view.iscan('missing.*.v')) == []
+    assert [v.value for v in view.scan('map.*.v')] == [1, 2]
+
+    projected = view.project(prices='results.*.offers.*.price', first='results.0.offers.0.price')
+    assert projected['first'] == 1
+    assert list(projected['prices']) == [1, 2, None, 3]
+
+
+def test_project_columns():
+    records = [
+        {'id': 1, 'offer': {'price': 1.5, 'currency': 'USD'}},
+        {'id': 2, 'offer': None},
+        {'id': 3, 'offer': {'price': 3.0}},
+    ]
+
+    columns = dictview.project_columns(
+        records,
+        dtypes={'id': 'q', 'price': 'd'},
+        fill={'currency': 'N/A'},
+        id='id', price='offer.price', currency='offer.currency'
+    )
+    assert columns['id'].tolist() == [1, 2, 3]
+    assert columns['price'][0] == 1.5 and columns['price'][1] != columns['price'][1]
+    assert columns['currency'] == ['USD', 'N/A', 'N/A']
+
+    columns = dictview.project_columns(iter(records), dtypes={'id': 'q'}, id='id', price='offer.price')
+    assert columns['id'].tolist() == [1, 2, 3]
+    assert columns['price'] == [1.5, None, 3.0]
+
+
+def test_project_columns_numpy():
+    np = pytest.importorskip('numpy')
+    records = [{'price': 1.5}, {}, {'price': 3}]
+
+    columns = dictview.project_columns(records, dtypes={'price': 'float32'}, price='price')
+    assert columns['price'].dtype == np.float32
+    assert np.isnan(columns['price'][1])
+    assert columns['price'][2] == 3
+
+
+def test_cursor(data):
+    cursor = data.cursor()
+    assert cursor.b[3][1].value == 5
+    assert cursor.reset(data.value).a.b.value == 1
+    assert cursor.reset(data.value).b[100].c.value is None
+    assert cursor.reset(data.value).e.f[0].value is None
+    assert cursor.reset(data.value).d.e.value is None
+    assert cursor.reset(data.value)[re.compile('^(a|e)$')].value == [{'b': 1}, None]
+
+    c = cursor.reset(data.value)
+    assert c.a is c
+
+
+def test_regex_indexed():
+    keys = ['price_%d' % i for i in range(50)] + ['title_%d' % i for i in range(50)]
+    container = dict((k, i) for i, k in enumerate(keys))
+    view = dictview(container, indexed=True)
+
+    # the last two overflow KEY_INDEX_MAX_PREFIXES inside a group
+    for pattern in ('^price_1', '^(price|title)_4$', '_7', '^(?:pr|ti)[it]',
+                    '^([abcdefgh][abcdefgh][abcdefgh])', '^(?:k|[abcdefgh][abcdefgh][abcdefgh])1'):
+        pattern = re.compile(pattern)
+        assert view[pattern].value == dictview(container)[pattern].value
+
+    container['price_new'] = -1
+    assert view[re.compile('^price_n')].value == [-1]
+
+    # same-size key swap
+    container.pop('price_0')
+    container['price_swapped'] = 99
+    assert view[re.compile('^price_(0|s)')].value == [99]
+    assert view[re.compile('^price')].value == dictview(container)[re.compile('^price')].value
+    assert view.scan('a').indexed
@@ -1,3 +1,5 @@
+import enum
+import itertools
 import typing as t
 
 import pytest
@@ -5,6 +7,14 @@ import pytest
 from grabutils.objview import Project, ObjectView, Zip
 
 
+class ExportView(ObjectView):
+    id = Project('id')
+    price = Project('offer', 'price', astype=float)
+
+    def attr_double(self, obj):
+        return obj['id'] * 2
+
+
 @pytest.fixture
 def data1() -> dict:
     return {
@@ -98,3 +108,180 @@ def test_objview1(data1: dict, model_class1: t.Type[ObjectView]):
     assert model.constant == 4
 
     assert model.foo == 'notfoo'
+
+
+def test_classmethods_are_not_fields():
+    assert ObjectView._export_fields == ()
+    assert 'export_many' not in ExportView._export_fields
+
+
+def test_objview_as_dict(data1: dict, model_class1: t.Type[ObjectView]):
+    def attr_foo(self, obj):
+        return obj['current']['notfoo']
+
+    fields = dict(
+        amount=Project('current', 'nested', 1, 'amount', astype=int),
+        currencies=Project('current', 'nested', astype=lambda v: [el['currency'] for el in v]),
+        missing=Project('current', 'fake', silent=True, default='-'),
+        transpose=Zip(Project('current', 'fields'), Project('current', 'values'), astype=dict),
+        constant=4,
+        attr_foo=attr_foo,
+    )
+    compiled_view = type('CompiledView', (ObjectView,), dict(fields))
+    plain_view = type('PlainView', (ObjectView,), dict(fields, Meta=type('Meta', (), {'compiled': False})))
+
+    expected = {
+        'amount': 1200,
+        'currencies': ['USD', 'AUD', 'EUR'],
+        'missing': '-',
+        'transpose': {'a': 1, 'b': 2, 'c': 3},
+        'constant': 4,
+        'foo': 'notfoo',
+    }
+    for view in (compiled_view, plain_view):
+        assert view(data1).as_dict() == expected
+        assert list(view(data1).as_dict()) == list(expected)
+
+    with pytest.raises(KeyError):
+        model_class1(data1).as_dict()
+
+
+@pytest.mark.parametrize('compiled', [True, False])
+def test_objview_non_literal_keys(compiled):
+    class K(str, enum.Enum):
+        price = 'price'
+
+    class I(enum.IntEnum):
+        first = 0
+
+    nan = float('nan')
+    view = type('KeyView', (ObjectView,), dict(
+        price=Project(K.price),
+        first=Project('items', I.first),
+        odd=Project(nan),
+        Meta=type('Meta', (), {'compiled': compiled}),
+    ))
+    assert view({'price': 1.5, 'items': ['a'], nan: 'nan'}).as_dict() == {'price': 1.5, 'first': 'a', 'odd': 'nan'}
+
+
+@pytest.mark.parametrize('workers,chunk_size,threshold', [(None, 1000, 50000), (1, 2, 0), (2, 2, 0), (2, 1, 3)])
+def test_objview_export_many(workers, chunk_size, threshold):
+    records = [{'id': i, 'offer': {'price': str(i)}} for i in range(5)]
+
+    assert ExportView.export_fields() == ('id', 'price', 'double')
+    assert list(ExportView.export_many(records, workers, chunk_size, parallel_threshold=threshold)) == [
+        {'id': i, 'price': float(i), 'double': i * 2} for i in range(5)
+    ]
+    assert list(ExportView.export_many(iter(records), workers, chunk_size, True, parallel_threshold=threshold)) == [
+        (i, float(i), i * 2) for i in range(5)
+    ]
+
+
+def test_objview_export_many_streams_in_process():
+    consumed = []
+
+    def records():
+        for i in itertools.count():
+            consumed.append(i)
+            yield {'id': i, 'offer': {'price': str(i)}}
+
+    rows = ExportView.export_many(records(), workers=1)
+    assert next(rows) == {'id': 0, 'price': 0., 'double': 0}
+    assert len(consumed) == 1
+
+
+def test_objview_cache():
+    calls = []
+
+    def counted(value):
+        calls.append(value)
+        return float(value)
+
+    class CachedView(ObjectView):
+        price = Project('price', astype=counted, cache=True)
+        plain = Project('price', astype=counted)
+
+    class MetaCachedView(ObjectView):
+        price = Project('price', astype=counted)
+
+        def attr_label(self, obj):
+            calls.append(obj['price'])
+            return 'price ' + obj['price']
+
+        class Meta:
+            cache = True
+
+    view = CachedView({'price': '1.5'})
+    assert view.price == view.price == 1.5
+    assert len(calls) == 1
+    assert view.plain == view.plain == 1.5
+    assert len(calls) == 3
+
+    view.invalidate('price')
+    assert view.price == 1.5
+    assert len(calls) == 4
+
+    calls.clear()
+    view = MetaCachedView({'price': '2'})
+    assert view.price == view.price == 2.
+    assert view.label == view.label == 'price 2'
+    assert len(calls) == 2
+
+    view.invalidate()
+    assert view.label == 'price 2'
+    assert len(calls) == 3
+
+    class CustomInitView(ObjectView):
+        __slots__ = ('record',)
+        price = Project('price', astype=counted, cache=True)
+
+        def __init__(self, record):
+            self.record = record
+
+        def _get_data(self):
+            return self.record
+
+    calls.clear()
+    view = CustomInitView({'price': '3'})
+    view.invalidate('price')
+    assert view.price == view.price == 3.
+    assert len(calls) == 1
+
+
+def test_objview_to_columns():
+    records = [{'id': str(i), 'offer': {'price': '%d.5' % i}} for i in range(3)]
+
+    columns = ExportView.to_columns(records)
+    assert list(columns) == ['id', 'price', 'double']
+    assert columns['id'] == ['0', '1', '2']
+    assert list(columns['price']) == [0.5, 1.5, 2.5]
+    assert columns['double'] == ['00', '11', '22']
+
+
+def test_objview_to_columns_conversion():
+    class NumericView(ObjectView):
+        price = Project('price', astype=float, silent=True, default=None)
+        count = Project('count', astype=int)
+
+    # batch conversion fails the same way as astype of every value
+    for record in ({'price': None, 'count': 1}, {'count': 1}):
+        with pytest.raises(TypeError):
+            NumericView(record).as_dict()
+        with pytest.raises(TypeError):
+            NumericView.to_columns([{'price': '1', 'count': 1}, record])
+
+    records = [{'price': '1', 'count': 2 ** 70}, {'price': 2, 'count': '3'}]
+    columns = NumericView.to_columns(records)
+    assert list(columns['price']) == [1., 2.]
+    assert list(columns['count']) == [2 ** 70, 3] == [NumericView(record).count for record in records]
+
+
+def test_objview_to_columns_structured():
+    np = pytest.importorskip('numpy')
+    records = [{'id': i, 'offer': {'price': '%d.5' % i}} for i in range(3)]
+
+    result = ExportView.to_columns(records, structured=True)
+    assert result.dtype.names == ('id', 'price', 'double')
+    assert result['price'].dtype == np.float64
+    assert result['price'].tolist() == [0.5, 1.5, 2.5]
+    assert result['double'].tolist() == [0, 2, 4]
@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from grabutils.rest import cache as cache_module
+from grabutils.rest.cache import HttpCache
+from grabutils.rest.client import (
+    CONCURRENCY, AsyncEndpoint, Cursor, Endpoint, NextLink, Offset, PageNumber, Session, gather_limited
+)
+
+
+def test_endpoint_urls(api_server):
+    api = Endpoint(api_server.url, key='k')
+    assert repr(api.users(42, page=2)) == api_server.url + '/users/42?key=k&page=2'
+    assert repr(api.users.posts) == api_server.url + '/users/posts?key=k'
+
+    value = api.users(42, page=2).get(params={'sort': 'name'}).json()
+    assert value['path'] == '/users/42'
+    assert value['query'] == {'key': 'k', 'page': '2', 'sort': 'name'}
+
+
+def test_pooled_session(api_server):
+    session = Session(pool_size=2, headers={'X-Client': 'grabutils'}, auth=('user', 'secret'), timeout=5)
+    api = Endpoint(api_server.url, session=session)
+    users = api.users
+    assert users(1)._session is session and api.users._session is session
+    # endpoint state does not shadow child urls
+    assert repr(api.session.cache.executor) == api_server.url + '/session/cache/executor'
+
+    value = users(1).get().json()
+    assert value['headers']['X-Client'] == 'grabutils'
+    assert value['headers']['Authorization'].startswith('Basic ')
+    assert users.post(json={'a': 1}).json()['body'] == '{"a": 1}'
+
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda idx: users(idx).get().json()['path'], range(40)))
+    assert paths == [f'/users/{idx}' for idx in range(40)]
+    # at most pool_size connections are opened and reused
+    assert api_server.connections <= 2
+
+
+def test_session_without_keep_alive(api_server):
+    api = Endpoint(api_server.url, session=Session(keep_alive=False))
+    for idx in range(3):
+        api.items(idx).get()
+    assert api_server.connections == 3
+    assert api_server.requests[0]['headers']['Connection'] == 'close'
+
+
+def test_async_endpoint(api_server):
+    in_flight = [0, 0]
+    lock = threading.Lock()
+
+    def slow(request):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return 200, {'id': request['query']['id']}, {'Content-Type': 'application/json'}
+
+    api_server.routes['/slow'] = slow
+    api = AsyncEndpoint(api_server.url, session=Session(pool_size=4), executor=ThreadPoolExecutor(4), key='k')
+    assert isinstance(api.slow(1), AsyncEndpoint) and api.slow._executor is api._executor
+
+    async def harvest():
+        first = await api.users(7).get()
+        values = await gather_limited((lambda idx=idx: api.slow.get(params={'id': idx}) for idx in range(12)),
+                                      concurrency=3)
+        return first, values
+
+    first, values = asyncio.run(harvest())
+    assert first.json()['path'] == '/users/7' and first.json()['query'] == {'key': 'k'}
+    assert [response.json()['id'] for response in values] == [str(idx) for idx in range(12)]
+    assert 1 < in_flight[1] <= 3
+
+    # executor is sized from the session pool without explicit one
+    in_flight[1] = 0
+    api = AsyncEndpoint(api_server.url, session=Session(pool_size=6))
+    assert api._executor._max_workers == 6 and api.slow._executor is api._executor
+
+    async def pooled():
+        async with api:
+            return await gather_limited((lambda idx=idx: api.slow.get(params={'id': idx}) for idx in range(12)), 6)
+
+    values = asyncio.run(pooled())
+    assert len(values) == 12 and 3 < in_flight[1] <= 6
+    # the created pool is shut down on exit, a passed executor is left running
+    with pytest.raises(RuntimeError):
+        api._executor.submit(int)
+    executor = ThreadPoolExecutor(1)
+    AsyncEndpoint(api_server.url, executor=executor).close()
+    assert executor.submit(int).result() == 0
+    executor.shutdown()
+
+    api = AsyncEndpoint(api_server.url)
+    assert api._executor._max_workers == CONCURRENCY
+    api.close()
+
+
+def test_gather_limited_errors():
+    async def fail(value):
+        if value == 2:
+            raise ValueError(value)
+        return value
+
+    assert asyncio.run(gather_limited([fail(v) for v in range(4)], 2, return_exceptions=True))[:2] == [0, 1]
+    with pytest.raises(ValueError):
+        asyncio.run(gather_limited([lambda v=v: fail(v) for v in range(4)], 2))
+    with pytest.raises(ValueError, match='concurrency'):
+        asyncio.run(gather_limited([lambda: fail(0)], 0))
+
+
+def test_http_cache(api_server, tmp_path):
+    versions = {'/doc': 1}
+
+    def etag_route(request):
+        etag = f'"v{versions["/doc"]}"'
+        if request['headers'].get('If-None-Match') == etag:
+            return 304, b'', {'ETag': etag}
+        return 200, {'version': versions['/doc']}, {'ETag': etag, 'Content-Type': 'application/json'}
+
+    def fresh_route(request):
+        return 200, {'fresh': True}, {'Cache-Control': 'max-age=60', 'Content-Type': 'application/json'}
+
+    def modified_route(request):
+        modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        if request['headers'].get('If-Modified-Since') == modified:
+            return 304, b'', {}
+        return 200, b'text', {'Last-Modified': modified}
+
+    api_server.routes.update({'/doc': etag_route, '/fresh': fresh_route, '/modified': modified_route,
+                              '/private': lambda request: (200, b'x', {'Cache-Control': 'no-store', 'ETag': '"x"'})})
+    cache = HttpCache(tmp_path)
+    api = Endpoint(api_server.url, session=Session(), cache=cache)
+
+    assert api.doc.get().json() == {'version': 1}
+    cached = api.doc.get()
+    assert cached.json() == {'version': 1} and cached.from_cache
+    versions['/doc'] = 2
+    assert api.doc.get().json() == {'version': 2}
+    assert cache.stats() == {'hits': 0, 'misses': 2, 'revalidated': 1}
+
+    api.fresh.get(), api.fresh.get()
+    assert cache.hits == 1 and len([r for r in api_server.requests if r['path'] == '/fresh']) == 1
+    assert api.fresh.get(params={'q': 1}).json() == {'fresh': True} and cache.misses == 4
+
+    api.modified.get()
+    assert api.modified.get().text == 'text' and cache.revalidated == 2
+    api.private.get(), api.private.get()
+    assert cache.misses == 7
+
+    # a new cache over the same directory revalidates instead of downloading again
+    restarted = HttpCache(tmp_path)
+    assert Endpoint(api_server.url, cache=restarted).doc.get().json() == {'version': 2}
+    assert restarted.stats() == {'hits': 0, 'misses': 0, 'revalidated': 1}
+    assert api.echo.post().json()['method'] == 'POST' and cache.misses == 7
+
+
+def test_paginate(api_server):
+    data = list(range(10))
+
+    def pages(request):
+        page, size = int(request['query']['page']), int(request['query'].get('per_page', 3))
+        return 200, {'items': data[(page - 1) * size:page * size]}, {}
+
+    def offsets(request):
+        offset, limit = int(request['query']['offset']), int(request['query']['limit'])
+        return 200, {'data': {'rows': data[offset:offset + limit]}}, {}
+
+    def cursors(request):
+        start = int(request['query'].get('cursor', 0))
+        return 200, {'items': data[start:start + 4], 'next_cursor': start + 4 if start + 4 < len(data) else None}, {}
+
+    def linked(request):
+        start = int(request['query'].get('start', 0))
+        headers = {'Link': f'</linked?start={start + 5}>; rel="next"'} if start + 5 < len(data) else {}
+        return 200, data[start:start + 5], headers
+
+    api_server.routes.update({'/pages': pages, '/offsets': offsets, '/cursors': cursors, '/linked': linked})
+    api = Endpoint(api_server.url, session=Session(), key='k')
+
+    assert list(api.pages.paginate(PageNumber(size=3))) == data
+    assert list(api.pages.paginate(PageNumber(), prefetch=0)) == data
+    assert list(api.offsets.paginate(Offset('data.rows', limit=4), prefetch=3)) == data
+    assert list(api.cursors.paginate(Cursor())) == data
+    assert list(api.linked.paginate(NextLink(None), prefetch=2)) == data
+    assert all(r['query'].get('key') == 'k' for r in api_server.requests if r['path'] != '/linked')
+
+    def requested(page):
+        return any(r['path'] == '/pages' and r['query']['page'] == str(page) for r in api_server.requests)
+
+    api_server.requests.clear()
+    lazy = api.pages.paginate(PageNumber(), prefetch=0)
+    assert next(lazy) == 0
+    time.sleep(0.1)
+    assert not requested(2)
+
+    ahead = api.pages.paginate(PageNumber(), prefetch=2)
+    assert next(ahead) == 0
+    deadline = time.time() + 2
+    while not requested(3) and time.time() < deadline:
+        time.sleep(0.01)
+    assert requested(3)
+    assert list(ahead) == data[1:]
+
+
+def test_http_cache_freshness_and_vary(api_server, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, 'time', type('Clock', (), {'time': staticmethod(lambda: now[0])}))
+
+    def fresh_etag(request):
+        if request['headers'].get('If-None-Match') == '"a"':
+            return 304, b'', {'ETag': '"a"'}
+        return 200, b'body', {'ETag': '"a"', 'Cache-Control': 'max-age=1'}
+
+    def language(request):
+        return 200, request['headers'].get('Accept-Language', '-').encode(), {'ETag': '"l"', 'Vary': 'Accept-Language'}
+
+    api_server.routes.update({'/fresh-etag': fresh_etag, '/language': language})
+    cache = HttpCache(tmp_path)
+    api = Endpoint(api_server.url, session=Session(), cache=cache)
+
+    fresh = api('fresh-etag')
+    assert fresh.get().text == 'body'
+    now[0] += 2
+    # 304 without Cache-Control keeps max-age of the stored response
+    assert [fresh.get().text for _ in range(3)] == ['body'] * 3
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'revalidated': 1}
+
+    assert api.language.get(headers={'Accept-Language': 'en'}).text == 'en'
+    assert api.language.get(headers={'Accept-Language': 'de'}).text == 'de'
+    assert cache.misses == 3